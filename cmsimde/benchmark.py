@@ -0,0 +1,312 @@
+#!/usr/bin/python
+
+"""Benchmarks for content.htm processing
+
+python3 cmsimde/benchmark.py split
+python3 cmsimde/benchmark.py newhead
+python3 cmsimde/benchmark.py parse
+python3 cmsimde/benchmark.py deep --sizes 1000 10000 50000
+python3 cmsimde/benchmark.py search
+python3 cmsimde/benchmark.py generate --sizes 1000 5000
+"""
+
+import argparse
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+import bs4
+
+sys.path.append(os.path.join(os.path.dirname(__file__)))
+# import flaskapp at the same directory
+import flaskapp
+import search
+
+
+def synthetic_content(n, repeat=10, seed=0):
+
+    """Return a synthetic content.htm with n h1, h2 and h3 pages
+    """
+
+    rand = random.Random(seed)
+    levels = ["1", "2", "3"]
+    outstring = []
+    for i in range(n):
+        # 第一個標題必須為 h1, 每 repeat 個標題重複一次 "Example" 標題
+        level = "1" if i == 0 else rand.choice(levels)
+        head = "Example" if i % repeat == 0 else "page " + str(i)
+        outstring.append("<h" + level + ">" + head + "</h" + level + ">")
+        outstring.append("<p>paragraph " + str(i) + " 中文內容</p><pre>print(" + str(i) + ")</pre>")
+    return "".join(outstring)
+
+
+def timed(function, *args):
+
+    """Return the result and seconds used by function(*args)
+    """
+
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def legacy_split(subject, htag):
+
+    """The original parse_content() loop which splits subject once per h tag
+    """
+
+    head_list = []
+    level_list = []
+    page_list = []
+    n = len(htag)
+    temp_data = subject.split(str(htag[0]))
+    if len(temp_data) > 2:
+        subject = str(htag[0]).join(temp_data[1:])
+    else:
+        subject = temp_data[1]
+    for i in range(1, n):
+        head_list.append(htag[i-1].text.strip())
+        level_list.append(htag[i-1].name[1])
+        temp_data = subject.split(str(htag[i]))
+        if len(temp_data) > 2:
+            subject = str(htag[i]).join(temp_data[1:])
+        else:
+            subject = temp_data[1]
+        page_list.append(temp_data[0])
+    head_list.append(htag[n-1].text.strip())
+    level_list.append(htag[n-1].name[1])
+    page_list.append(subject.split(str(htag[n-1]))[0])
+    return head_list, level_list, page_list
+
+
+def bench_split(sizes, legacy_limit):
+
+    """Compare the legacy split loop with split_content()
+    """
+
+    print("%8s %10s %12s %12s" % ("headings", "bytes", "legacy (s)", "split (s)"))
+    for n in sizes:
+        soup = bs4.BeautifulSoup(synthetic_content(n), "html.parser")
+        subject = soup.decode()
+        htag = soup.find_all(["h1", "h2", "h3"])
+        pages, split_time = timed(flaskapp.split_content, subject, htag)
+        if n <= legacy_limit:
+            legacy, legacy_time = timed(legacy_split, subject, htag)
+            # 兩種方法必須得到相同的頁面
+            assert legacy == ([p[0] for p in pages], [p[1] for p in pages],
+                              [subject[p[2]:p[3]] for p in pages])
+            legacy_time = "%.4f" % legacy_time
+        else:
+            legacy_time = "skipped"
+        print("%8d %10d %12s %12.4f" % (n, len(subject.encode("utf-8")), legacy_time, split_time))
+
+
+def bs4_split(subject):
+
+    """Split normalized subject with bs4 html.parser as the "html.parser" engine does
+    """
+
+    return flaskapp.split_content(subject, bs4.BeautifulSoup(subject, "html.parser").find_all(["h1", "h2", "h3"]))
+
+
+def bench_parse(sizes):
+
+    """Compare bs4 html.parser with heading_tokens() when splitting normalized content
+    """
+
+    print("%8s %10s %14s %14s" % ("headings", "bytes", "html.parser (s)", "tokenizer (s)"))
+    for n in sizes:
+        subject = flaskapp.normalize_content(synthetic_content(n))
+        expected, bs4_time = timed(bs4_split, subject)
+        pages, tokenizer_time = timed(flaskapp.split_headings, subject)
+        assert pages == expected
+        print("%8d %10d %14.4f %14.4f" % (n, len(subject.encode("utf-8")), bs4_time, tokenizer_time))
+
+
+def nested_content(depth):
+
+    """Return a content.htm whose second page nests div and list elements depth levels deep
+    """
+
+    return "<h1>Top</h1><p>top</p><h2>Deep</h2>" + "<div>" * depth + "<p>deepest div</p>" + "</div>" * depth + \
+           "<ul>" + "<li><ul>" * depth + "<li>deepest item</li>" + "</ul></li>" * depth + "</ul><h2>Last</h2><p>last</p>"
+
+
+def bench_deep(sizes):
+
+    """Normalize, split and extract the text of deeply nested content without raising the recursion limit
+    """
+
+    print("recursion limit", sys.getrecursionlimit())
+    print("%8s %12s %12s %12s %12s" % ("depth", "normalize", "split", "index", "text"))
+    for depth in sizes:
+        subject, normalize_time = timed(flaskapp.normalize_content, nested_content(depth))
+        (normalized, pages), split_time = timed(flaskapp._split_pages, subject)
+        assert [p[0] for p in pages] == ["Top", "Deep", "Last"]
+        index, index_time = timed(flaskapp.build_page_index, subject, True)
+        assert index["head"] == ["Top", "Deep", "Last"]
+        text, text_time = timed(search.visible_text, normalized[pages[1][2]:pages[1][3]])
+        # 最深層的文字不可遺漏
+        assert "deepest div" in text and "deepest item" in text
+        print("%8d %12.4f %12.4f %12.4f %12.4f" % (depth, normalize_time, split_time, index_time, text_time))
+
+
+def legacy_search(head, page, keyword):
+
+    """The original doSearch() scan which lowercases every page per query
+    """
+
+    return [head[i] for i in range(len(head))
+            if keyword.lower() in page[i].lower() or keyword.lower() in head[i].lower()]
+
+
+def bench_search(sizes, keywords=("paragraph 4321", "page 42", "print(7", "中文內容")):
+
+    """Compare the legacy doSearch() scan with building and querying the search index
+    """
+
+    print("%8s %12s %12s %14s %8s %10s %10s" % ("headings", "build (s)", "update (s)", "keyword", "results",
+          "legacy (ms)", "index (ms)"))
+    for n in sizes:
+        subject = flaskapp.normalize_content(synthetic_content(n))
+        pages = flaskapp.split_headings(subject)
+        head = [p[0] for p in pages]
+        page = [subject[p[2]:p[3]] for p in pages]
+        index = search.SearchIndex()
+        not_used, build_time = timed(index.update, head, page, lambda i: search.visible_text(page[i]))
+        # 修改一個頁面後增量更新
+        page = page[:1] + ["<p>changed</p>"] + page[2:]
+        not_used, update_time = timed(index.update, head, page, lambda i: search.visible_text(page[i]))
+        for keyword in keywords:
+            legacy, legacy_time = timed(legacy_search, head, page, keyword)
+            results, index_time = timed(index.search, keyword)
+            print("%8d %12.4f %12.4f %14s %8d %10.3f %10.3f" % (n, build_time, update_time, keyword, len(results),
+                  legacy_time * 1000, index_time * 1000))
+
+
+def legacy_visible(element):
+
+    """The original _visible() filter of tipue search text nodes
+    """
+
+    if element.parent.name in ['style', 'script', '[document]', 'head', 'title']:
+        return False
+    elif re.match('<!--.*-->', str(element.encode('utf-8'))):
+        return False
+    return True
+
+
+def legacy_page_texts(page, orders=None):
+
+    """The original tipue search text extraction which builds an lxml soup for each page
+    """
+
+    if orders is None:
+        orders = range(len(page))
+    return [" ".join(filter(legacy_visible, bs4.BeautifulSoup(page[i], "lxml").find_all(string=True))) for i in orders]
+
+
+def bench_generate(sizes):
+
+    """Compare full static site generation using legacy_page_texts() and page_texts()
+    """
+
+    flaskapp.init.Init.generate_workers = 1
+    curdir, config_dir = flaskapp._curdir, flaskapp.config_dir
+    page_texts = flaskapp.page_texts
+    print("%8s %14s %14s %12s %12s" % ("headings", "legacy text", "legacy total", "text", "total"))
+    for n in sizes:
+        site = tempfile.mkdtemp()
+        os.makedirs(site + "/config")
+        os.makedirs(site + "/content")
+        flaskapp._curdir, flaskapp.config_dir = site, site + "/config/"
+        flaskapp.clear_content_cache()
+        flaskapp.write_content(flaskapp.normalize_content(synthetic_content(n)))
+        head, level, page = flaskapp.parse_content()
+        result = []
+        for texts in (legacy_page_texts, page_texts):
+            flaskapp.page_texts = texts
+            timings = flaskapp.generate_static_site(head, level, False)
+            result.extend([dict(timings)["page text"], sum(seconds for name, seconds in timings)])
+        print("%8d %14.4f %14.4f %12.4f %12.4f" % tuple([n] + result))
+        shutil.rmtree(site)
+    flaskapp._curdir, flaskapp.config_dir = curdir, config_dir
+    flaskapp.page_texts = page_texts
+    flaskapp.clear_content_cache()
+
+
+def legacy_newhead(head):
+
+    """The original generate_pages() numbering of repeated headings
+    """
+
+    newhead = []
+    for i, v in enumerate(head):
+        totalcount = head.count(v)
+        count = head[:i].count(v)
+        newhead.append(v + "-" + str(count + 1) if totalcount > 1 else v)
+    return newhead
+
+
+def legacy_unique(items):
+
+    """The original unique() loop
+    """
+
+    found = set([])
+    keep = []
+    count = {}
+    for item in items:
+        if item not in found:
+            count[item] = 0
+            found.add(item)
+            keep.append(item)
+        else:
+            count[item] += 1
+            keep.append(str(item) + "_" + str(count[item]))
+    return keep
+
+
+def bench_newhead(sizes, legacy_limit):
+
+    """Compare the legacy duplicate heading numbering with number_duplicates()
+    """
+
+    print("%8s %12s %12s %14s" % ("headings", "legacy (s)", "new (s)", "new (us/head)"))
+    for n in sizes:
+        # 每 10 個標題重複一次 "Example", 另有重複 3 次的標題
+        head = ["Example" if i % 10 == 0 else "page " + str(i // 3) for i in range(n)]
+        newhead, new_time = timed(flaskapp.number_duplicates, head)
+        assert flaskapp.unique(head) == legacy_unique(head)
+        if n <= legacy_limit:
+            legacy, legacy_time = timed(legacy_newhead, head)
+            assert legacy == newhead
+            legacy_time = "%.4f" % legacy_time
+        else:
+            legacy_time = "skipped"
+        print("%8d %12s %12.4f %14.3f" % (n, legacy_time, new_time, new_time / n * 1e6))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("bench", choices=["split", "newhead", "parse", "deep", "search", "generate"])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--legacy-limit", type=int, default=10000,
+                        help="skip the legacy implementation above this number of headings")
+    args = parser.parse_args()
+    if args.bench == "split":
+        bench_split(args.sizes, args.legacy_limit)
+    elif args.bench == "newhead":
+        bench_newhead(args.sizes, args.legacy_limit)
+    elif args.bench == "parse":
+        bench_parse(args.sizes)
+    elif args.bench == "deep":
+        bench_deep(args.sizes)
+    elif args.bench == "search":
+        bench_search(args.sizes)
+    elif args.bench == "generate":
+        bench_generate(args.sizes)
@@ -4,7 +4,7 @@
 """
 
 from flask import Flask, send_from_directory, request, redirect, \
-    render_template, session, make_response, url_for, flash
+    render_template, session, make_response, url_for, flash, Response, stream_with_context
 from flask_cors import CORS
 import random
 import math
@@ -28,18 +28,29 @@ import sys
 import bs4
 # for ssavePage and savePage
 import shutil
+import tempfile
+# for page_index and read_page
+import json
+import mmap
 # for merge_sequence
 from difflib import SequenceMatcher
 import inspect
-# 針對單一頁面有許多 html 標註時, 增大遞迴圈數設定
-sys.setrecursionlimit(1000000)
+import functools
+# for generate_static_site
+import concurrent.futures
+import multiprocessing
+import time
 
 # get the parent directory of the file
 currentdir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
 parentdir = os.path.dirname(currentdir)
 sys.path.insert(0,parentdir) 
+# storage.py 與 search.py 位於 flaskapp.py 所在目錄, 以 from cmsimde import flaskapp 啟動時也必須能夠 import
+sys.path.insert(1, currentdir)
 _curdir = os.path.join(os.getcwd(), parentdir)
 import init
+from storage import SqliteStorage, page_hash
+from search import SearchIndex, normalize_text, visible_text
 # for start_static function
 #import os
 import subprocess
@@ -77,6 +88,45 @@ ip = init.Init.ip
 dynamic_port = init.Init.dynamic_port
 static_port = init.Init.static_port
 
+# parse_content() 的解析結果快取, 以 content.htm 的 stat (mtime, size) 判定是否需要重新解析
+# savePage 與 ssavePage 存檔後會以 clear_content_cache() 清除
+_content_cache = {}
+_content_cache_lock = threading.Lock()
+# heading_tokens() 只比對標題, 註解, CDATA 與內容不解析的 script, style 標註
+_heading_token = re.compile(r"<!--.*?-->|<!\[CDATA\[.*?\]\]>|<(script|style)\b[^>]*>.*?</\1>|<h([1-3])(?:\s[^>]*)?>(.*?)</h\2>", re.S)
+_heading_inner = re.compile(r"<(?:h[1-3]\b|script\b|style\b|!)")
+# heading_orders() 與 page_neighbours() 針對非快取標題數列 (例如 generate_pages 中的 newhead) 所建立的對照表
+_heading_orders_cache = {}
+# _cached_menu() 依 head 與 level 的 hash 及網站標題保存的選單
+_menu_cache = {}
+# generate_static_site() 產生頁面時, 各 process 共用的 static_context()
+_generate_context = None
+# init.Init.content_storage 為 "sqlite" 時, content_storage() 建立的 SqliteStorage
+_storage = None
+# parse_config() 讀取的 site title 與 password hash, 以及 config 檔案的 signature
+_config_cache = None
+# doSearch() 使用的全文索引, 依頁面 sha1 增量更新
+_search_index = SearchIndex()
+# page_texts() 依頁面 sha1 保存的可見文字, 只保留目前內容的頁面
+_page_text_cache = {"page": None, "hash": [], "text": {}}
+# static_pages() 將動態網站的路徑換為以 content 為基準的相對路徑, 可由 init.Init.static_rewrite_rules 取代
+static_rewrite_rules = [
+    # 直接在此將 /images/ 換為 ./../images/, /downloads/ 換為 ./../downloads/
+    ('src="/images/', 'src="./../images/'),
+    ('href="/downloads/', 'href="./../downloads/'),
+    # 配合 object 標註導入 svg data 來源的轉換
+    ('data="/images/', 'data="./../images/'),
+    # 假如有 src="/static/ace/ 則換為 src="./../static/ace/
+    ('src="/static/', 'src="./../cmsimde/static/'),
+    # 假如有 src=/downloads 則換為 src=./../../downloads
+    ('src="/downloads', 'src="./../downloads'),
+    # 假如有 pythonpath:['/static/' 則換為 ./../cmsimde/static/
+    ("pythonpath:['/static/'", "pythonpath:['./../cmsimde/static/'"),
+    # 針對 wink3 假如有 data-dirname="/static" 換為 data-dirname="./../cmsimde/static"
+    ('data-dirname="/static"', 'data-dirname="./../cmsimde/static"'),
+    # 假如有 /get_page 則需額外使用 regex 進行字串代換, 表示要在靜態網頁直接取網頁 (尚未完成)
+    ]
+
 # 必須先將 download_dir 設為 static_folder, 然後才可以用於 download 方法中的 app.static_folder 的呼叫
 app = Flask(__name__)
 CORS(app, support_credentials=False)
@@ -107,8 +157,8 @@ def acpform():
     """acp form routine
     """
 
-    head, level, page = parse_content()
-    directory = render_menu(head, level, page)
+    head, level = content_outline()
+    directory = render_menu(head, level, None)
     if not isAdmin():
         return set_css() + "<div class='container'><nav>" + \
                  directory + "</nav><section><h1>Login</h1><form method='post' action='checkLogin'> \
@@ -131,6 +181,18 @@ def password_generator(size=4, chars=string.ascii_lowercase + string.digits):
     return ''.join(random.choice(chars) for _ in range(size))
 
 
+def backup_content():
+
+    """Copy content.htm or the pages in content.db to content_backup.htm
+    """
+
+    storage = content_storage()
+    if storage is not None:
+        _atomic_write(config_dir + "content_backup.htm", storage.export())
+    else:
+        shutil.copy2(config_dir + "content.htm", config_dir + "content_backup.htm")
+
+
 # 定義 password_generator() 後就可以產生 token
 token = password_generator()
 @app.route('/checkLogin', methods=['POST'])
@@ -154,6 +216,42 @@ def checkLogin():
     return redirect('/')
 
  
+def build_page_index(subject, normalized=False):
+
+    """Build the page index of content.htm from its content
+
+    各頁面的標題, 層級, 在 content.htm 中的 byte 起迄位置與內容 sha1
+    subject 必須為 normalize_content() 整理過的內容, 否則傳回 None
+    已知 subject 為 normalize_content() 的結果時, normalized 設為 True 不再以 bs4 檢查
+    """
+
+    if "\r" in subject:
+        return None
+    if normalized:
+        pages = split_headings(subject)
+    else:
+        normalized_subject, pages = _split_pages(subject)
+        # 頁面位置必須對應到 content.htm 的原始內容
+        if normalized_subject != subject:
+            return None
+    if not pages:
+        return None
+    index = {"head": [], "level": [], "start": [], "end": [], "hash": []}
+    offset = 0
+    position = 0
+    for head, level, start, end in pages:
+        offset += len(subject[position:start].encode("utf-8"))
+        content = subject[start:end].encode("utf-8")
+        index["head"].append(head)
+        index["level"].append(level)
+        index["start"].append(offset)
+        index["end"].append(offset + len(content))
+        index["hash"].append(hashlib.sha1(content).hexdigest())
+        offset += len(content)
+        position = end
+    return index
+
+
 def checkMath():
 
     """Use LaTeX Equation rendering
@@ -171,6 +269,121 @@ def checkMath():
     return outstring
 
 
+@functools.lru_cache(maxsize=None)
+def chrome_template(name):
+
+    """Return the compiled page chrome template templates/chrome/<name>.html
+
+    樣板只在第一次使用時編譯, 之後每個 request 只需 render
+    """
+
+    return app.jinja_env.get_template("chrome/" + name + ".html")
+
+
+def clear_config_cache():
+
+    """Clear the site title and password cached by parse_config()
+    """
+
+    global _config_cache
+    _config_cache = None
+
+
+def clear_content_cache():
+
+    """Clear the parsed content.htm cache
+    """
+
+    _content_cache.pop("entry", None)
+    _content_cache.pop("index", None)
+
+
+def _content_entry(head):
+
+    """Return the parse_content() or page_index() cache entry holding head
+    """
+
+    for entry in (_content_cache.get("entry"), _content_cache.get("index")):
+        if entry is not None and head is entry["head"]:
+            return entry
+    return None
+
+
+def content_conflict():
+
+    """Return the message shown when content.htm and content.db were both changed
+    """
+
+    return "config/content.htm 與 config/content.db 在上次匯出後都已修改, 為保留 content.htm 的內容, 資料庫的頁面沒有寫入 content.htm.<br />" + \
+           "請比對兩者後, 刪除 content.db 以重新匯入 content.htm, 或刪除 content.htm 以匯出資料庫的頁面."
+
+
+def content_outline():
+
+    """Return the head and level lists of the pages without their html
+
+    選單, sitemap 與管理頁面只需要標題, 由 page index 提供而不載入各頁面內容
+    """
+
+    index = None
+    if content_storage() is not None or os.path.isfile(config_dir + "content.htm"):
+        index = page_index()
+    if index is None:
+        # content.htm 未經 normalize_content() 整理, 只能完整解析
+        head, level, page = parse_content()
+        return head, level
+    return index["head"], index["level"]
+
+
+def content_pages(content):
+
+    """Split content returned by normalize_content() into a list of (heading, level, html, heading_html) pages
+
+    heading_html 為上一頁結束至本頁內容之間的原始標題標註, 第一頁另含標題之前的內容, 依序串接即為原來的 content
+    """
+
+    # content 已整理過, 不再以 _remove_h123_attrs() 處理, 單獨一頁的標題才不會被改為 h1
+    pages = []
+    end = 0
+    for head, level, start, page_end in split_headings(content):
+        pages.append((head, level, content[start:page_end], content[end:start]))
+        end = page_end
+    return pages
+
+
+def content_storage():
+
+    """Return the SqliteStorage of config/content.db, None when pages are kept in content.htm
+
+    第一次使用時, 若資料庫沒有頁面或 content.htm 在資料庫之外修改過則匯入 content.htm
+    """
+
+    global _storage
+    if getattr(init.Init, "content_storage", "htm") != "sqlite":
+        return None
+    if _storage is None:
+        with _content_cache_lock:
+            if _storage is None:
+                storage = SqliteStorage(config_dir + "content.db")
+                sync_content(storage)
+                _storage = storage
+    return _storage
+
+
+def content_signature():
+
+    """Return the stat signature (mtime, size) of content.htm
+
+    使用 SQLite 存放頁面時, 以資料庫的存檔次數為 signature
+    """
+
+    storage = content_storage()
+    if storage is not None:
+        return "sqlite", storage.version()
+    stat = os.stat(config_dir + "content.htm")
+    return stat.st_mtime_ns, stat.st_size
+
+
 def correct_url():
 
     """get the correct url for http and https edit mode
@@ -194,8 +407,8 @@ def delete_file():
 
     if not isAdmin():
         return redirect("/login")
-    head, level, page = parse_content()
-    directory = render_menu(head, level, page)
+    head, level = content_outline()
+    directory = render_menu(head, level, None)
     # for multiple files selection
     filename = request.form.getlist('filename')
     if filename is None:
@@ -249,8 +462,8 @@ def doDelete():
             except:
                 outstring += filename[index] + "Error, can not delete files!<br />"
 
-    head, level, page = parse_content()
-    directory = render_menu(head, level, page)
+    head, level = content_outline()
+    directory = render_menu(head, level, None)
 
     return set_css() + "<div class='container'><nav>" + \
                directory + "</nav><section><h1>Download List</h1>" + \
@@ -267,8 +480,14 @@ def doAcp():
         return redirect("/login")
     else:
         commit_messages = request.form['commit']
-        head, level, page = parse_content()
-        directory = render_menu(head, level, page)
+        # 以 content.htm 提交至倉儲
+        exported = export_content()
+        head, level = content_outline()
+        directory = render_menu(head, level, None)
+        if not exported:
+            return set_css() + "<div class='container'><nav>"+ \
+                       directory + "</nav><section><h1>ERROR</h1>" + content_conflict() + \
+                       "</section></div></body></html>"
         # execute acp.bat with commit_messages
         if os.name == 'nt':
             os.system("acp.bat \"" + commit_messages + "\"")
@@ -291,16 +510,16 @@ def doSearch():
         keyword = request.form['keyword']
         head, level, page = parse_content()
         directory = render_menu(head, level, page)
-        match = ""
-        for index in range(len(head)):
-            if (keyword != "" or None) and (keyword.lower() in page[index].lower() or \
-            keyword.lower() in head[index].lower()): \
-                match += "<a href='/get_page/" + head[index] + "'>" + \
-                                head[index] + "</a><br />"
+        match = []
+        # 只比對頁面的可見文字, 不再比對 html 標註與屬性
+        for heading, snippet in search_index(head, page).search(keyword):
+            match.extend(["<a href='/get_page/", heading, "'>", heading, "</a><br />"])
+            if snippet:
+                match.extend(["<p>", snippet, "</p>"])
         return set_css() + "<div class='container'><nav>"+ \
                    directory + "</nav><section><h1>Search Result</h1>keyword: " + \
-                   keyword.lower() + "<br /><br />in the following pages:<br /><br />" + \
-                   match + "</section></div></body></html>"
+                   html_escape(keyword.lower()) + "<br /><br />in the following pages:<br /><br />" + \
+                   "".join(match) + "</section></div></body></html>"
 
 
 @app.route('/download/', methods=['GET'])
@@ -370,22 +589,22 @@ def download_list():
     totalpage = math.ceil(total_rows/int(item_per_page))
     starti = int(item_per_page) * (int(page) - 1) + 1
     endi = starti + int(item_per_page) - 1
-    outstring = "<form method='post' action='delete_file'>"
+    outstring = ["<form method='post' action='delete_file'>"]
     notlast = False
     if total_rows > 0:
-        outstring += "<br />"
+        outstring.append("<br />")
         if (int(page) * int(item_per_page)) < total_rows:
             notlast = True
         if int(page) > 1:
-            outstring += "<a href='"
-            outstring += "download_list?&amp;page=1&amp;item_per_page=" + str(item_per_page) + \
-                                "&amp;keyword=" + str(session.get('download_keyword'))
-            outstring += "'><<</a> "
+            outstring.append("<a href='")
+            outstring.append("download_list?&amp;page=1&amp;item_per_page=" + str(item_per_page) + \
+                                "&amp;keyword=" + str(session.get('download_keyword')))
+            outstring.append("'><<</a> ")
             page_num = int(page) - 1
-            outstring += "<a href='"
-            outstring += "download_list?&amp;page=" + str(page_num) + "&amp;item_per_page=" + \
-                                str(item_per_page) + "&amp;keyword=" + str(session.get('download_keyword'))
-            outstring += "'>Previous</a> "
+            outstring.append("<a href='")
+            outstring.append("download_list?&amp;page=" + str(page_num) + "&amp;item_per_page=" + \
+                                str(item_per_page) + "&amp;keyword=" + str(session.get('download_keyword')))
+            outstring.append("'>Previous</a> ")
 
         span = 10
 
@@ -393,41 +612,41 @@ def download_list():
             if index>= 0 and index< totalpage:
                 page_now = index + 1 
                 if page_now == int(page):
-                    outstring += "<font size='+1' color='red'>" + str(page) + " </font>"
+                    outstring.append("<font size='+1' color='red'>" + str(page) + " </font>")
                 else:
-                    outstring += "<a href='"
-                    outstring += "download_list?&amp;page=" + str(page_now) + "&amp;item_per_page=" + \
-                                        str(item_per_page) + "&amp;keyword=" + str(session.get('download_keyword'))
-                    outstring += "'>"+str(page_now) + "</a> "
+                    outstring.append("<a href='")
+                    outstring.append("download_list?&amp;page=" + str(page_now) + "&amp;item_per_page=" + \
+                                        str(item_per_page) + "&amp;keyword=" + str(session.get('download_keyword')))
+                    outstring.append("'>"+str(page_now) + "</a> ")
 
         if notlast == True:
             nextpage = int(page) + 1
-            outstring += " <a href='"
-            outstring += "download_list?&amp;page=" + str(nextpage) + "&amp;item_per_page=" + \
-                                str(item_per_page) + "&amp;keyword=" + str(session.get('download_keyword'))
-            outstring += "'>Next</a>"
-            outstring += " <a href='"
-            outstring += "download_list?&amp;page=" + str(totalpage) + "&amp;item_per_page=" + \
-                                str(item_per_page) + "&amp;keyword=" + str(session.get('download_keyword'))
-            outstring += "'>>></a><br /><br />"
+            outstring.append(" <a href='")
+            outstring.append("download_list?&amp;page=" + str(nextpage) + "&amp;item_per_page=" + \
+                                str(item_per_page) + "&amp;keyword=" + str(session.get('download_keyword')))
+            outstring.append("'>Next</a>")
+            outstring.append(" <a href='")
+            outstring.append("download_list?&amp;page=" + str(totalpage) + "&amp;item_per_page=" + \
+                                str(item_per_page) + "&amp;keyword=" + str(session.get('download_keyword')))
+            outstring.append("'>>></a><br /><br />")
 
         if (int(page) * int(item_per_page)) < total_rows:
             notlast = True
-            outstring += downloadlist_access_list(files, starti, endi) + "<br />"
+            outstring.append(downloadlist_access_list(files, starti, endi) + "<br />")
         else:
-            outstring += "<br /><br />"
-            outstring += downloadlist_access_list(files, starti, total_rows) + "<br />"
+            outstring.append("<br /><br />")
+            outstring.append(downloadlist_access_list(files, starti, total_rows) + "<br />")
 
         if int(page) > 1:
-            outstring += "<a href='"
-            outstring += "download_list?&amp;page=1&amp;item_per_page=" + str(item_per_page) + \
-                                "&amp;keyword=" + str(session.get('download_keyword'))
-            outstring += "'><<</a> "
+            outstring.append("<a href='")
+            outstring.append("download_list?&amp;page=1&amp;item_per_page=" + str(item_per_page) + \
+                                "&amp;keyword=" + str(session.get('download_keyword')))
+            outstring.append("'><<</a> ")
             page_num = int(page) - 1
-            outstring += "<a href='"
-            outstring += "download_list?&amp;page=" + str(page_num) + "&amp;item_per_page=" + \
-                                str(item_per_page) + "&amp;keyword=" + str(session.get('download_keyword'))
-            outstring += "'>Previous</a> "
+            outstring.append("<a href='")
+            outstring.append("download_list?&amp;page=" + str(page_num) + "&amp;item_per_page=" + \
+                                str(item_per_page) + "&amp;keyword=" + str(session.get('download_keyword')))
+            outstring.append("'>Previous</a> ")
 
         span = 10
 
@@ -436,33 +655,33 @@ def download_list():
             if index >=0 and index < totalpage:
                 page_now = index + 1
                 if page_now == int(page):
-                    outstring += "<font size='+1' color='red'>" + str(page)+" </font>"
+                    outstring.append("<font size='+1' color='red'>" + str(page)+" </font>")
                 else:
-                    outstring += "<a href='"
-                    outstring += "download_list?&amp;page=" + str(page_now) + \
+                    outstring.append("<a href='")
+                    outstring.append("download_list?&amp;page=" + str(page_now) + \
                                         "&amp;item_per_page=" + str(item_per_page) + \
-                                        "&amp;keyword=" + str(session.get('download_keyword'))
-                    outstring += "'>" + str(page_now)+"</a> "
+                                        "&amp;keyword=" + str(session.get('download_keyword')))
+                    outstring.append("'>" + str(page_now)+"</a> ")
 
         if notlast == True:
             nextpage = int(page) + 1
-            outstring += " <a href='"
-            outstring += "download_list?&amp;page=" + str(nextpage) + "&amp;item_per_page=" + \
-                                str(item_per_page) + "&amp;keyword=" + str(session.get('download_keyword'))
-            outstring += "'>Next</a>"
-            outstring += " <a href='"
-            outstring += "download_list?&amp;page=" + str(totalpage) + "&amp;item_per_page=" + \
-                                str(item_per_page) + "&amp;keyword=" + str(session.get('download_keyword'))
-            outstring += "'>>></a>"
+            outstring.append(" <a href='")
+            outstring.append("download_list?&amp;page=" + str(nextpage) + "&amp;item_per_page=" + \
+                                str(item_per_page) + "&amp;keyword=" + str(session.get('download_keyword')))
+            outstring.append("'>Next</a>")
+            outstring.append(" <a href='")
+            outstring.append("download_list?&amp;page=" + str(totalpage) + "&amp;item_per_page=" + \
+                                str(item_per_page) + "&amp;keyword=" + str(session.get('download_keyword')))
+            outstring.append("'>>></a>")
     else:
-        outstring += "no data!"
-    outstring += "<br /><br /><input type='submit' value='delete'><input type='reset' value='reset'></form>"
+        outstring.append("no data!")
+    outstring.append("<br /><br /><input type='submit' value='delete'><input type='reset' value='reset'></form>")
 
-    head, level, page = parse_content()
-    directory = render_menu(head, level, page)
+    head, level = content_outline()
+    directory = render_menu(head, level, None)
 
-    return set_css() + "<div class='container'><nav>" + \
-               directory + "</nav><section><h1>Download List</h1>" + outstring + "<br/><br /></body></html>"
+    return stream_html(set_css(), "<div class='container'><nav>", directory,
+                       "</nav><section><h1>Download List</h1>", outstring, "<br/><br /></body></html>")
 
 
 def downloadlist_access_list(files, starti, endi):
@@ -474,34 +693,34 @@ def downloadlist_access_list(files, starti, endi):
     # popup window to view images, video or STL files, other files can be downloaded directly
     # files are all the data to list, from starti to endi
     # add file size
-    outstring = ""
+    outstring = []
     for index in range(int(starti)-1, int(endi)):
         fileName, fileExtension = os.path.splitext(files[index])
         fileExtension = fileExtension.lower()
         fileSize = sizeof_fmt(os.path.getsize(download_dir+"/"+files[index]))
         # images files
         if fileExtension == ".png" or fileExtension == ".jpg" or fileExtension == ".gif":
-            outstring += '<input type="checkbox" name="filename" value="' + \
+            outstring.append('<input type="checkbox" name="filename" value="' + \
                               files[index] + '"><a href="javascript:;" onClick="window.open(\'/images/' +  \
                               files[index] + '\',\'images\', \'catalogmode\',\'scrollbars\')">' + \
-                              files[index] + '</a> (' + str(fileSize) + ')<br />'
+                              files[index] + '</a> (' + str(fileSize) + ')<br />')
         # stl files
         elif fileExtension == ".stl":
-            outstring += '<input type="checkbox" name="filename" value="' + \
+            outstring.append('<input type="checkbox" name="filename" value="' + \
                               files[index] + '"><a href="javascript:;" onClick="window.open(\'/static/viewstl.html?src=' + '/downloads/' + \
                               files[index] + '\',\'images\', \'catalogmode\',\'scrollbars\')">' + \
-                              files[index] + '</a> (' + str(fileSize) + ')<br />'
+                              files[index] + '</a> (' + str(fileSize) + ')<br />')
         # flv files
         elif fileExtension == ".flv":
-            outstring += '<input type="checkbox" name="filename" value="' + \
+            outstring.append('<input type="checkbox" name="filename" value="' + \
                               files[index] + '"><a href="javascript:;" onClick="window.open(\'/flvplayer?filepath=/downloads/' + \
-            files[index] + '\',\'images\', \'catalogmode\',\'scrollbars\')">' + files[index] + '</a> (' + str(fileSize) + ')<br />'
+            files[index] + '\',\'images\', \'catalogmode\',\'scrollbars\')">' + files[index] + '</a> (' + str(fileSize) + ')<br />')
         # direct download files
         else:
-            outstring += "<input type='checkbox' name='filename' value='" + files[index] + \
+            outstring.append("<input type='checkbox' name='filename' value='" + files[index] + \
                               "'><a href='./../downloads/" + files[index] + "'>" + files[index] + \
-                              "</a> (" + str(fileSize) + ")<br />"
-    return outstring
+                              "</a> (" + str(fileSize) + ")<br />")
+    return "".join(outstring)
 
 
 # downloads 方法主要將位於 downloads 目錄下的檔案送回瀏覽器
@@ -521,15 +740,32 @@ def downloadselect_access_list(files, starti, endi):
     與 file_selector 搭配的取檔程式
     """
 
-    outstring = ""
+    outstring = []
     for index in range(int(starti)-1, int(endi)):
         fileName, fileExtension = os.path.splitext(files[index])
         fileSize = os.path.getsize(download_dir + "/" + files[index])
-        outstring += '''<input type="checkbox" name="filename" value="''' + \
+        outstring.append('''<input type="checkbox" name="filename" value="''' + \
                           files[index] + '''"><a href="#" onclick='window.setLink("/downloads/''' + \
                           files[index] + '''",0); return false;'>''' + files[index] + \
-                          '''</a> (''' + str(sizeof_fmt(fileSize)) + ''')<br />'''
-    return outstring
+                          '''</a> (''' + str(sizeof_fmt(fileSize)) + ''')<br />''')
+    return "".join(outstring)
+
+
+def duplicate_counts(items):
+
+    """Return (occurrence, total occurrences) of each element of items
+    """
+
+    # 先計算各元素總數, 再逐一累計目前出現次數, 兩次線性掃描
+    total = {}
+    for item in items:
+        total[item] = total.get(item, 0) + 1
+    seen = {}
+    counts = []
+    for item in items:
+        seen[item] = seen.get(item, 0) + 1
+        counts.append((seen[item], total[item]))
+    return counts
 
 
 @app.route('/edit_config', defaults={'edit': 1})
@@ -539,8 +775,8 @@ def edit_config(edit):
     """Config edit html form
     """
 
-    head, level, page = parse_content()
-    directory = render_menu(head, level, page)
+    head, level = content_outline()
+    directory = render_menu(head, level, None)
     if not isAdmin():
         return set_css() + "<div class='container'><nav>" + \
                  directory + "</nav><section><h1>Login</h1><form method='post' action='checkLogin'> \
@@ -571,15 +807,30 @@ def edit_page(edit):
     if not isAdmin():
         return redirect('/login')
     else:
-        head, level, page = parse_content()
-        directory = render_menu(head, level, page)
-        pagedata =file_get_contents(config_dir + "content.htm")
+        head, level = content_outline()
+        directory = render_menu(head, level, None)
+        storage = content_storage()
+        if storage is not None:
+            pagedata = storage.export()
+        else:
+            pagedata =file_get_contents(config_dir + "content.htm")
         #outstring = tinymce_editor(directory, cgi.escape(pagedata))
         # for python 3.8
         outstring = tinymce_editor(directory, html_escape(pagedata))
         return outstring
 
 
+@functools.lru_cache(maxsize=None)
+def editor_shell():
+
+    """Return the static tinymce scripts and toolbar config shared by every editor
+
+    editorhead() 與 editorfoot() 內容固定, 只需組合一次
+    """
+
+    return editorhead() + '''</head>''' + editorfoot()
+
+
 def editorfoot():
 
     """Add editor foot html
@@ -643,12 +894,32 @@ def error_log(self, info="Error"):
     """ Return error log
     """
 
-    head, level, page = parse_content()
-    directory = render_menu(head, level, page)
+    head, level = content_outline()
+    directory = render_menu(head, level, None)
     return set_css() + "<div class='container'><nav>" + \
              directory + "</nav><section><h1>ERROR</h1>" + info + "</section></div></body></html>"
 
 
+def export_content():
+
+    """Write the pages in content.db to content.htm when SQLite storage is used
+
+    content.htm 與資料庫都在上次匯入或匯出後修改過時不覆寫 content.htm, 傳回 False
+    """
+
+    storage = content_storage()
+    if storage is None:
+        return True
+    if not sync_content(storage):
+        return False
+    synced = storage.synced()
+    # 先取得 version 再匯出, 匯出途中的存檔會在下次匯出時寫入
+    version = storage.version()
+    if synced is None or synced[1] != version:
+        storage.mark_synced(_atomic_write(config_dir + "content.htm", storage.export()), version)
+    return True
+
+
 @app.route('/favicon.ico')
 def favicon():
 
@@ -679,111 +950,111 @@ def file_lister(directory, type=None, page=1, item_per_page=10):
     totalpage = math.ceil(total_rows/int(item_per_page))
     starti = int(item_per_page) * (int(page) - 1) + 1
     endi = starti + int(item_per_page) - 1
-    outstring = file_selector_script()
+    outstring = [file_selector_script()]
     notlast = False
     if total_rows > 0:
-        outstring += "<br />"
+        outstring.append("<br />")
         if (int(page) * int(item_per_page)) < total_rows:
             notlast = True
         if int(page) > 1:
-            outstring += "<a href='"
-            outstring += "file_selector?type=" + type + \
+            outstring.append("<a href='")
+            outstring.append("file_selector?type=" + type + \
                               "&amp;page=1&amp;item_per_page=" + \
-                              str(item_per_page) + "&amp;keyword=" + str(session.get('download_keyword'))
-            outstring += "'><<</a> "
+                              str(item_per_page) + "&amp;keyword=" + str(session.get('download_keyword')))
+            outstring.append("'><<</a> ")
             page_num = int(page) - 1
-            outstring += "<a href='"
-            outstring += "file_selector?type=" + type + \
+            outstring.append("<a href='")
+            outstring.append("file_selector?type=" + type + \
                               "&amp;page=" + str(page_num) + \
                               "&amp;item_per_page=" +str(item_per_page) + \
-                              "&amp;keyword=" + str(session.get('download_keyword'))
-            outstring += "'>Previous</a> "
+                              "&amp;keyword=" + str(session.get('download_keyword')))
+            outstring.append("'>Previous</a> ")
         span = 10
         for index in range(int(page)-span, int(page)+span):
             if index>= 0 and index< totalpage:
                 page_now = index + 1 
                 if page_now == int(page):
-                    outstring += "<font size='+1' color='red'>" + str(page) + " </font>"
+                    outstring.append("<font size='+1' color='red'>" + str(page) + " </font>")
                 else:
-                    outstring += "<a href='"
-                    outstring += "file_selector?type=" + type + "&amp;page=" + \
+                    outstring.append("<a href='")
+                    outstring.append("file_selector?type=" + type + "&amp;page=" + \
                                       str(page_now) + "&amp;item_per_page=" + \
                                       str(item_per_page) + "&amp;keyword=" + \
-                                      str(session.get('download_keyword'))
-                    outstring += "'>" + str(page_now)+"</a> "
+                                      str(session.get('download_keyword')))
+                    outstring.append("'>" + str(page_now)+"</a> ")
 
         if notlast == True:
             nextpage = int(page) + 1
-            outstring += " <a href='"
-            outstring += "file_selector?type=" + type + "&amp;page=" + \
+            outstring.append(" <a href='")
+            outstring.append("file_selector?type=" + type + "&amp;page=" + \
                                str(nextpage) + "&amp;item_per_page=" + \
                                str(item_per_page) + "&amp;keyword=" + \
-                               str(session.get('download_keyword'))
-            outstring += "'>Next</a>"
-            outstring += " <a href='"
-            outstring += "file_selector?type=" + type + "&amp;page=" + \
+                               str(session.get('download_keyword')))
+            outstring.append("'>Next</a>")
+            outstring.append(" <a href='")
+            outstring.append("file_selector?type=" + type + "&amp;page=" + \
                                str(totalpage) + "&amp;item_per_page=" + \
                                str(item_per_page) + "&amp;keyword=" + \
-                               str(session.get('download_keyword'))
-            outstring += "'>>></a><br /><br />"
+                               str(session.get('download_keyword')))
+            outstring.append("'>>></a><br /><br />")
         if (int(page) * int(item_per_page)) < total_rows:
             notlast = True
             if type == "file":
-                outstring += downloadselect_access_list(files, starti, endi) + "<br />"
+                outstring.append(downloadselect_access_list(files, starti, endi) + "<br />")
             else:
-                outstring += imageselect_access_list(files, starti, endi) + "<br />"
+                outstring.append(imageselect_access_list(files, starti, endi) + "<br />")
         else:
-            outstring += "<br /><br />"
+            outstring.append("<br /><br />")
             if type == "file":
-                outstring += downloadselect_access_list(files, starti, total_rows) + "<br />"
+                outstring.append(downloadselect_access_list(files, starti, total_rows) + "<br />")
             else:
-                outstring += imageselect_access_list(files, starti, total_rows) + "<br />"
+                outstring.append(imageselect_access_list(files, starti, total_rows) + "<br />")
         if int(page) > 1:
-            outstring += "<a href='"
-            outstring += "file_selector?type=" + type + \
+            outstring.append("<a href='")
+            outstring.append("file_selector?type=" + type + \
                               "&amp;page=1&amp;item_per_page=" + str(item_per_page) + \
-                              "&amp;keyword=" + str(session.get('download_keyword'))
-            outstring += "'><<</a> "
+                              "&amp;keyword=" + str(session.get('download_keyword')))
+            outstring.append("'><<</a> ")
             page_num = int(page) - 1
-            outstring += "<a href='"
-            outstring += "file_selector?type=" + type + "&amp;page=" + \
+            outstring.append("<a href='")
+            outstring.append("file_selector?type=" + type + "&amp;page=" + \
                                str(page_num) + "&amp;item_per_page=" + \
                                str(item_per_page) + "&amp;keyword=" + \
-                               str(session.get('download_keyword'))
-            outstring += "'>Previous</a>"
+                               str(session.get('download_keyword')))
+            outstring.append("'>Previous</a>")
         span = 10
         for index in range(int(page)-span, int(page)+span):
             if index >=0 and index < totalpage:
                 page_now = index + 1
                 if page_now == int(page):
-                    outstring += "<font size='+1' color='red'>"+str(page)+" </font>"
+                    outstring.append("<font size='+1' color='red'>"+str(page)+" </font>")
                 else:
-                    outstring += "<a href='"
-                    outstring += "file_selector?type=" + type + "&amp;page=" + \
+                    outstring.append("<a href='")
+                    outstring.append("file_selector?type=" + type + "&amp;page=" + \
                                        str(page_now) + "&amp;item_per_page=" + \
                                        str(item_per_page) + "&amp;keyword=" + \
-                                       str(session.get('download_keyword'))
-                    outstring += "'>" + str(page_now) + "</a> "
+                                       str(session.get('download_keyword')))
+                    outstring.append("'>" + str(page_now) + "</a> ")
         if notlast == True:
             nextpage = int(page) + 1
-            outstring += " <a href='"
-            outstring += "file_selector?type=" + type + "&amp;page=" + \
+            outstring.append(" <a href='")
+            outstring.append("file_selector?type=" + type + "&amp;page=" + \
                                str(nextpage) + "&amp;item_per_page=" + \
                                str(item_per_page) + "&amp;keyword=" + \
-                               str(session.get('download_keyword'))
-            outstring += "'>Next</a>"
-            outstring += " <a href='"
-            outstring += "file_selector?type=" + type + "&amp;page=" + \
+                               str(session.get('download_keyword')))
+            outstring.append("'>Next</a>")
+            outstring.append(" <a href='")
+            outstring.append("file_selector?type=" + type + "&amp;page=" + \
                                str(totalpage) + "&amp;item_per_page=" + \
-                               str(item_per_page) + "&amp;keyword=" + str(session.get('download_keyword'))
-            outstring += "'>>></a>"
+                               str(item_per_page) + "&amp;keyword=" + str(session.get('download_keyword')))
+            outstring.append("'>>></a>")
     else:
-        outstring += "no data!"
+        outstring.append("no data!")
 
     if type == "file":
-        return outstring+"<br /><br /><a href='fileuploadform'>file upload</a>"
+        return "".join(outstring) + "<br /><br /><a href='fileuploadform'>file upload</a>"
     else:
-        return outstring+"<br /><br /><a href='imageuploadform'>image upload</a>"
+        return "".join(outstring) + "<br /><br /><a href='imageuploadform'>image upload</a>"
 
 
 # 配合 Tinymce4 讓使用者透過 html editor 引用所上傳的 files 與 images
@@ -873,8 +1144,8 @@ def fileuploadform(edit):
     """
 
     if isAdmin():
-        head, level, page = parse_content()
-        directory = render_menu(head, level, page)
+        head, level = content_outline()
+        directory = render_menu(head, level, None)
         return set_css() + "<div class='container'><nav>"+ \
                  directory + "</nav><section><h1>file upload</h1>" + \
                  '''<script src="/static/jquery.js" type="text/javascript"></script>
@@ -936,69 +1207,142 @@ def generate_pages():
     if not isAdmin():
         return redirect('/login')
     else:
-        head, level, page = parse_content()
-        directory = render_menu(head, level, page)
-        # 處理重複標題 head 數列， 重複標題則按照次序加上 1, 2, 3...
-        newhead = []
-        for i, v in enumerate(head):
-            # 各重複標題總數
-            totalcount = head.count(v)
-            # 目前重複標題出現總數
-            count = head[:i].count(v)
-            # 針對重複標題者, 附加目前重複標題出現數 +1, 未重複採原標題
-            newhead.append(v + "-" + str(count + 1) if totalcount > 1 else v)
-        # 刪除 content 目錄中所有 html 檔案
-        filelist = [ f for f in os.listdir(_curdir + "/content/") if f.endswith(".html") ]
-        for f in filelist:
-            os.remove(os.path.join(_curdir + "/content/", f))
-        # 這裡需要建立專門寫出 html 的 write_page
-        # index.html
-        with open(_curdir + "/content/index.html", "w", encoding="utf-8") as f:
-            f.write(get_page2(None, newhead, 0))
-        # sitemap
-        with open(_curdir + "/content/sitemap.html", "w", encoding="utf-8") as f:
-            # 為了修改為動態與靜態網頁雙向轉檔, 這裡需要 newhead pickle
-            # sitemap2 需要 newhead
-            f.write(sitemap2(newhead))
-        # 以下轉檔, 改用 newhead 數列
-
-        def visible(element):
-            if element.parent.name in ['style', 'script', '[document]', 'head', 'title']:
-                return False
-            elif re.match('<!--.*-->', str(element.encode('utf-8'))):
-                return False
-            return True
-
-        search_content = []
-        # generate each page html under content directory
-        for i in range(len(newhead)):
-            # 在此必須要將頁面中的 /images/ 字串換為 images/, /downloads/ 換為 downloads/
-            # 因為 Flask 中靠 /images/ 取檔案, 但是一般 html 則採相對目錄取檔案
-            # 此一字串置換在 get_page2 中進行
-            # 加入 tipue search 模式
-            get_page_content = []
-            html_doc = get_page2(newhead[i], newhead, 0, get_page_content)
-            """
-            # html = "<meta property='head' content='H1'>"
-            soup = BeautifulSoup(html)
-            title = soup.find("meta", property="head")
-            print(title["content"])
-            """
-            html_doc = html_doc.replace('<meta charset="utf-8">', '<meta charset="utf-8">\n<meta property="head" content="H'+str(level[i])+'">')
-            soup = bs4.BeautifulSoup(" ".join(get_page_content), "lxml")
-            search_content.append({"title": newhead[i], "text": " ".join(filter(visible, soup.findAll(text=True))), "tags": "", "url": newhead[i] + ".html"})
-            with open(_curdir + "/content/" + newhead[i] + ".html", "w", encoding="utf-8") as f:
-                # 增加以 newhead 作為輸入
-                f.write(html_doc)
-        # GENERATE js file
-        with open(_curdir + "/content/tipuesearch_content.js", "w", encoding="utf-8") as f:
-            f.write("var tipuesearch = {\"pages\": " + str(search_content) + "};")
+        # content.htm 在資料庫之外修改過時可能重新匯入, 之後才取得標題
+        exported = export_content()
+        head, level = content_outline()
+        directory = render_menu(head, level, None)
+        # /generate_pages?full=1 重新產生所有頁面
+        timings = generate_static_site(head, level, incremental=not request.args.get("full"))
+        report = "<br />".join(name + ": " + "%.3f" % seconds + " s" for name, seconds in timings)
+        if not exported:
+            report += "<br /><br />" + content_conflict()
         return set_css() + "<div class='container'><nav>" + \
                      directory + "</nav><section><h1>Generate Pages</h1>" + \
-                     "已經將網站轉為靜態網頁!" + \
+                     "已經將網站轉為靜態網頁!<br /><br />" + report + \
                      "</section></div></body></html>"
 
 
+def _generate_init(context):
+
+    """Set the static page context used by _generate_page in worker processes
+    """
+
+    global _generate_context
+    _generate_context = context
+
+
+def _generate_page(i):
+
+    """Write the i-th static page, return its tipue search entry
+    """
+
+    context = _generate_context
+    newhead = context["head"]
+    # 在此必須要將頁面中的 /images/ 字串換為 images/, /downloads/ 換為 downloads/
+    # 因為 Flask 中靠 /images/ 取檔案, 但是一般 html 則採相對目錄取檔案
+    # 此一字串置換在 static_context 中進行
+    html_doc = get_page2(newhead[i], newhead, 0, None, context)
+    html_doc = html_doc.replace('<meta charset="utf-8">', '<meta charset="utf-8">\n<meta property="head" content="H'+str(context["level"][i])+'">')
+    with open(_curdir + "/content/" + newhead[i] + ".html", "w", encoding="utf-8") as f:
+        # 增加以 newhead 作為輸入
+        f.write(html_doc)
+    # 加入 tipue search 模式, 頁面文字已由 generate_static_site 取出
+    return {"title": newhead[i], "text": context["text"][i], "tags": "", "url": newhead[i] + ".html"}
+
+
+def generate_static_site(head, level, incremental=True):
+
+    """Generate static html files and tipue search data under content directory
+
+    選單與各頁面共用的內容只建立一次, 各頁面再分配給多個 process 產生
+    incremental 時依據 config/generate.json 記錄的各頁 hash, 只重新產生有變動的頁面
+    傳回各階段所花費的秒數
+    """
+
+    timings = []
+    start = time.perf_counter()
+    # 處理重複標題 head 數列， 重複標題則按照次序加上 1, 2, 3...
+    newhead = number_duplicates(head)
+    # 以下轉檔, 改用 newhead 數列
+    context = static_context(newhead)
+    manifest = load_generate_manifest() if incremental else {}
+    site = static_site_hash(context)
+    if manifest.get("site") != site:
+        # 選單或頁面樣板改變時, 所有頁面都必須重新產生
+        manifest = {}
+    old_pages = manifest.get("pages", {})
+    pages = {}
+    changed = []
+    for i in range(len(newhead)):
+        filename = newhead[i] + ".html"
+        key = static_page_hash(context, i)
+        entry = old_pages.get(filename)
+        if entry is not None and entry.get("key") == key and "tipue" in entry and \
+                entry.get("stat") == _file_signature(_curdir + "/content/" + filename):
+            pages[filename] = entry
+        else:
+            pages[filename] = {"key": key}
+            changed.append(i)
+    timings.append(("prepare", time.perf_counter() - start))
+    start = time.perf_counter()
+    # 刪除 content 目錄中已不存在頁面的 html 檔案, 非 incremental 時全部刪除
+    filelist = [ f for f in os.listdir(_curdir + "/content/") if f.endswith(".html") ]
+    for f in filelist:
+        if not incremental or (f not in pages and f not in ("index.html", "sitemap.html")):
+            os.remove(os.path.join(_curdir + "/content/", f))
+    # index.html
+    _write_if_changed(_curdir + "/content/index.html", get_page2(None, newhead, 0, None, context))
+    # sitemap
+    # sitemap2 需要 newhead
+    _write_if_changed(_curdir + "/content/sitemap.html", sitemap2(newhead, context))
+    timings.append(("index and sitemap", time.perf_counter() - start))
+    start = time.perf_counter()
+    # 只有重新產生的頁面需要 tipue search 文字, 與 doSearch 共用 page_texts() 的結果
+    context["text"] = dict(zip(changed, page_texts(context["source"], changed)))
+    timings.append(("page text", time.perf_counter() - start))
+    start = time.perf_counter()
+    # generate each page html under content directory
+    workers = generate_workers(len(changed))
+    if workers > 1:
+        # 以 fork 建立的 process 直接沿用 context, 各頁面僅需傳送頁面次序
+        with concurrent.futures.ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("fork"),
+                initializer=_generate_init, initargs=(context,)) as executor:
+            tipue_pages = list(executor.map(_generate_page, changed,
+                                            chunksize=max(1, len(changed) // (workers * 4))))
+    else:
+        _generate_init(context)
+        tipue_pages = [_generate_page(i) for i in changed]
+    for i, tipue in zip(changed, tipue_pages):
+        filename = newhead[i] + ".html"
+        pages[filename]["tipue"] = tipue
+        pages[filename]["stat"] = _file_signature(_curdir + "/content/" + filename)
+    timings.append(("pages (" + str(len(changed)) + " of " + str(len(newhead)) + " pages, " +
+                    str(workers) + " processes)", time.perf_counter() - start))
+    start = time.perf_counter()
+    # GENERATE js file
+    write_tipue_search([pages[v + ".html"]["tipue"] for v in newhead])
+    _atomic_write(config_dir + "generate.json",
+                  json.dumps({"site": site, "pages": pages}, ensure_ascii=False))
+    timings.append(("tipue search", time.perf_counter() - start))
+    return timings
+
+
+def generate_workers(pages):
+
+    """Return the number of processes used to generate pages
+    """
+
+    # 沒有 fork 的平台 (Windows) 以 spawn 啟動 process 會重新執行啟動程式, 因此只在單一 process 中產生頁面
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return 1
+    # 預設在目前的 process 中產生頁面, waitress 以多個 thread 執行, fork 時子 process 可能繼承其他 thread 持有的 lock
+    workers = getattr(init.Init, "generate_workers", 1)
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    # 每個 process 至少分配 16 頁, 頁面太少時不值得啟動 process
+    return max(1, min(workers, pages // 16))
+
+
 # seperate page need heading and edit variables, if edit=1, system will enter edit mode
 # single page edit will use ssavePage to save content, it means seperate save page
 @app.route('/get_page')
@@ -1009,138 +1353,117 @@ def get_page(heading, edit):
     """Get dynamic page content
     """
 
-    head, level, page = parse_content()
-    directory = render_menu(head, level, page)
-    if heading is None:
-        heading = head[0]
-    # 因為同一 heading 可能有多頁, 因此不可使用 head.index(heading) 搜尋 page_order
-    page_order_list, page_content_list = search_content(head, page, heading)
-    return_content = ""
-    pagedata = ""
-    outstring = ""
-    outstring_duplicate = ""
-    pagedata_duplicate = ""
-    outstring_list = []
+    # 利用 page index 只讀取所要的頁面, 無需解析整個 content.htm
+    index = page_index()
+    if index is not None:
+        head, level = index["head"], index["level"]
+        if heading is None:
+            heading = head[0]
+        page_order_list = heading_orders(head).get(heading, [])
+        page_content_list = [read_page(index, i) for i in page_order_list]
+        # content.htm 在讀取期間被改寫, 改由 parse_content() 取頁面
+        if None in page_content_list:
+            index = None
+    if index is None:
+        head, level, page = parse_content()
+        if heading is None:
+            heading = head[0]
+        # 因為同一 heading 可能有多頁, 因此不可使用 head.index(heading) 搜尋 page_order
+        page_order_list, page_content_list = search_content(head, page, heading)
+    directory = render_menu(head, level, None)
+    return_content = []
+    links = []
+    neighbours = page_neighbours(head)
     for i in range(len(page_order_list)):
         #page_order = head.index(heading)
         page_order = page_order_list[i]
-        if page_order == 0:
+        previous_head, next_head = neighbours[page_order]
+        if previous_head is None:
             last_page = ""
         else:
-            last_page = head[page_order-1] + " << <a href='/get_page/" + \
-                             head[page_order-1] + "'>Previous</a>"
-        if page_order == len(head) - 1:
+            last_page = previous_head + " << <a href='/get_page/" + \
+                             previous_head + "'>Previous</a>"
+        if next_head is None:
             # no next page
             next_page = ""
         else:
-            next_page = "<a href='/get_page/"+ head[page_order+1] + \
-                              "'>Next</a> >> " + head[page_order+1]
+            next_page = "<a href='/get_page/"+ next_head + \
+                              "'>Next</a> >> " + next_head
         if len(page_order_list) > 1:
-            return_content += last_page + " " + next_page + \
-                                      "<br /><h1>" + heading + "</h1>" + \
-                                      page_content_list[i] + "<br />"+ \
-                                      last_page + " " + next_page + "<br /><hr>"
-            pagedata_duplicate = "<h"+level[page_order] + ">" + heading + \
-                                          "</h"+level[page_order] + ">" + page_content_list[i]
-            outstring_list.append(last_page + " " + next_page + "<br />" + tinymce_editor(directory, html_escape(pagedata_duplicate), page_order))
+            return_content.extend([last_page, " ", next_page, "<br /><h1>", heading, "</h1>",
+                                   page_content_list[i], "<br />", last_page, " ", next_page, "<br /><hr>"])
         else:
-            return_content += last_page + " " + next_page + "<br /><h1>" +\
-                                      heading + "</h1>" + page_content_list[i] + "<br />" + last_page + " " + next_page
-            
-        pagedata += "<h"+level[page_order] + ">" + heading + "</h" + level[page_order] + ">" + page_content_list[i]
-        # 利用 html_escape() 將 specialchar 轉成只能顯示的格式
-        outstring += last_page + " " + next_page + "<br />" + tinymce_editor(directory, html_escape(pagedata), page_order)
-    
+            return_content.extend([last_page, " ", next_page, "<br /><h1>", heading, "</h1>",
+                                   page_content_list[i], "<br />", last_page, " ", next_page])
+        links.append(last_page + " " + next_page)
+
     # edit=0 for viewpage
     if edit == 0:
-        return set_css() + "<div class='container'><nav>" + \
-                 directory + "</nav><section>" + return_content + "</section></div>" + checkMath() + "</body></html>"
+        return stream_html(set_css(), "<div class='container'><nav>", directory, "</nav><section>",
+                           return_content, "</section></div>", checkMath(), "</body></html>")
     # enter edit mode
     else:
         # check if administrator
         if not isAdmin():
             redirect(url_for('login'))
         else:
+            # 編輯器只在 edit 模式且確認為管理者後才產生, 瀏覽頁面時不產生
+            editors = page_editors(directory, heading, level, page_order_list, page_content_list, links)
             if len(page_order_list) > 1:
                 # 若碰到重複頁面頁印, 且要求編輯, 則導向 edit_page
                 #return redirect("/edit_page")
-                for i in range(len(page_order_list)):
-                    outstring_duplicate += outstring_list[i] + "<br /><hr>"
-                return outstring_duplicate
+                return "".join(editor + "<br /><hr>" for editor in editors)
             else:
-                return outstring
+                return "".join(editors)
 
 
-def get_page2(heading, head, edit, get_page_content = None):
+def get_page2(heading, head, edit, get_page_content = None, context = None):
 
     """Get page content and replace certain string for static site
     """
 
-    not_used_head, level, page = parse_content()
-    # 直接在此將 /images/ 換為 ./../images/, /downloads/ 換為 ./../downloads/, 以 content 為基準的相對目錄設定
-
-    page = [w.replace('src="/images/', 'src="./../images/') for w in page]
-    page = [w.replace('href="/downloads/', 'href="./../downloads/') for w in page]
-    # 配合 object 標註導入 svg data 來源的轉換
-    page = [w.replace('data="/images/', 'data="./../images/') for w in page]
-    # 假如有 src="/static/ace/ 則換為 src="./../static/ace/
-    page = [w.replace('src="/static/', 'src="./../cmsimde/static/') for w in page]
-    # 假如有 src=/downloads 則換為 src=./../../downloads
-    page = [w.replace('src="/downloads', 'src="./../downloads') for w in page]
-    # 假如有 pythonpath:['/static/' 則換為 ./../cmsimde/static/
-    page = [w.replace("pythonpath:['/static/'", "pythonpath:['./../cmsimde/static/'") for w in page]
-    # 針對 wink3 假如有 data-dirname="/static" 換為 data-dirname="./../cmsimde/static"
-    page = [w.replace("data-dirname=\"/static\"", "data-dirname=\"./../cmsimde/static\"") for w in page]
-    # 假如有 /get_page 則需額外使用 regex 進行字串代換, 表示要在靜態網頁直接取網頁 (尚未完成)
-    #page = [w.replace('/get_page', '') for w in page]
-
-    directory = render_menu2(head, level, page)
+    # generate_static_site 產生各頁面時共用同一個 context
+    if context is None:
+        context = static_context(head)
+    level = context["level"]
+    page = context["page"]
+    directory = context["directory"]
     if heading is None:
         heading = head[0]
     # 因為同一 heading 可能有多頁, 因此不可使用 head.index(heading) 搜尋 page_order
     page_order_list, page_content_list = search_content(head, page, heading)
     if get_page_content != None:
         get_page_content.extend(page_content_list)
-    return_content = ""
-    pagedata = ""
-    outstring = ""
-    outstring_duplicate = ""
-    pagedata_duplicate = ""
-    outstring_list = []
+    return_content = []
+    links = []
+    neighbours = page_neighbours(head)
     for i in range(len(page_order_list)):
         page_order = page_order_list[i]
-        if page_order == 0:
+        previous_head, next_head = neighbours[page_order]
+        if previous_head is None:
             last_page = ""
         else:
             #last_page = head[page_order-1]+ " << <a href='/get_page/" + head[page_order-1] + "'>Previous</a>"
-            last_page = head[page_order-1] + " << <a href='"+head[page_order-1] + ".html'>Previous</a>"
-        if page_order == len(head) - 1:
+            last_page = previous_head + " << <a href='"+previous_head + ".html'>Previous</a>"
+        if next_head is None:
             # no next page
             next_page = ""
         else:
             #next_page = "<a href='/get_page/"+head[page_order+1] + "'>Next</a> >> " + head[page_order+1]
-            next_page = "<a href='" + head[page_order+1] + ".html'>Next</a> >> " + head[page_order+1]
+            next_page = "<a href='" + next_head + ".html'>Next</a> >> " + next_head
         if len(page_order_list) > 1:
-            return_content += last_page + " " + next_page + "<br /><h1>" + \
-                                      heading + "</h1>" + page_content_list[i] + \
-                                      "<br />" + last_page + " "+ next_page + "<br /><hr>"
-            pagedata_duplicate = "<h"+level[page_order] + ">" + heading + "</h" + level[page_order]+">"+page_content_list[i]
-            outstring_list.append(last_page + " " + next_page + "<br />" + tinymce_editor(directory, html_escape(pagedata_duplicate), page_order))
+            return_content.extend([last_page, " ", next_page, "<br /><h1>", heading, "</h1>",
+                                   page_content_list[i], "<br />", last_page, " ", next_page, "<br /><hr>"])
         else:
-            return_content += last_page + " " + next_page + "<br /><h1>" + \
-                                      heading + "</h1>" + page_content_list[i] + \
-                                      "<br />" + last_page + " " + next_page
+            return_content.extend([last_page, " ", next_page, "<br /><h1>", heading, "</h1>",
+                                   page_content_list[i], "<br />", last_page, " ", next_page])
+        links.append(last_page + " " + next_page)
 
-        pagedata += "<h" + level[page_order] + ">" + heading + \
-                          "</h" + level[page_order] + ">" + page_content_list[i]
-        # 利用 html_escape() 將 specialchar 轉成只能顯示的格式
-        outstring += last_page + " " + next_page + "<br />" + tinymce_editor(directory, html_escape(pagedata), page_order)
-    
     # edit=0 for viewpage
     if edit == 0:
         return set_css2() + '''<div class='container'><nav>
         '''+ \
-        directory + "<div id=\"tipue_search_content\">" + return_content + \
+        directory + "<div id=\"tipue_search_content\">" + "".join(return_content) + \
         '''</div>
         
     <!-- footer -->
@@ -1190,14 +1513,14 @@ def get_page2(heading, head, edit, get_page_content = None):
         if not isAdmin():
             redirect(url_for('login'))
         else:
+            # 編輯器只在 edit 模式使用, 靜態頁面產生時不需 request context
+            editors = page_editors(directory, heading, level, page_order_list, page_content_list, links)
             if len(page_order_list) > 1:
                 # 若碰到重複頁面頁印, 且要求編輯, 則導向 edit_page
                 #return redirect("/edit_page")
-                for i in range(len(page_order_list)):
-                    outstring_duplicate += outstring_list[i] + "<br /><hr>"
-                return outstring_duplicate
+                return "".join(editor + "<br /><hr>" for editor in editors)
             else:
-                return outstring
+                return "".join(editors)
 
 
 def get_wan_address():
@@ -1248,6 +1571,79 @@ def get_wan_ipv6_address():
         return None
 
 
+def heading_tokens(subject):
+
+    """Return the (head, level, tag string) of h1, h2 and h3 tags in subject without bs4
+
+    subject 必須為 normalize_content() 整理過的內容, 略過註解, CDATA 與 script, style 中的文字
+    標題中有其他標題, 註解或 script 時傳回 None, 改由 bs4 處理
+    """
+
+    headings = []
+    for match in _heading_token.finditer(subject):
+        if match.group(2) is None:
+            continue
+        inner = match.group(3)
+        if _heading_inner.search(inner):
+            return None
+        # 與 tag.text 相同: 去除標註後還原 bs4 輸出時跳脫的字元
+        text = re.sub(r"<[^>]*>", "", inner).replace("&lt;", "<").replace("&gt;", ">").replace("&amp;", "&")
+        headings.append((text.strip(), match.group(2), match.group(0)))
+    return headings
+
+
+def _head_entry(head):
+
+    """Return the dict holding tables derived from the heading list head
+
+    parse_content() 或 page_index() 快取中的標題數列使用快取的 entry, 其他數列另外保存
+    """
+
+    entry = _content_entry(head)
+    if entry is None:
+        entry = _heading_orders_cache.get(id(head))
+        if entry is None or entry["head"] is not head:
+            if len(_heading_orders_cache) >= 8:
+                _heading_orders_cache.clear()
+            entry = {"head": head}
+            _heading_orders_cache[id(head)] = entry
+    return entry
+
+
+def heading_orders(head):
+
+    """Return a dict mapping each heading of head to its page orders
+
+    重複標題的 page order 依出現次序排列, 同一版本的標題數列只建立一次
+    """
+
+    entry = _head_entry(head)
+    orders = entry.get("orders")
+    if orders is None:
+        orders = {}
+        for i, v in enumerate(head):
+            orders.setdefault(v, []).append(i)
+        entry["orders"] = orders
+    return orders
+
+
+def _index_pages(index):
+
+    """Return head, level and page lists of content.htm cut at the page index positions
+    """
+
+    with open(config_dir + "content.htm", "rb") as file:
+        subject = file.read()
+    page = []
+    for start, end, hash in zip(index["start"], index["end"], index["hash"]):
+        content = subject[start:end]
+        # content.htm 在建立 index 後被改寫, 改由 bs4 解析
+        if hashlib.sha1(content).hexdigest() != hash:
+            return None
+        page.append(content.decode("utf-8"))
+    return list(index["head"]), list(index["level"]), page
+
+
 @app.route('/image_delete_file', methods=['POST'])
 def image_delete_file():
 
@@ -1257,8 +1653,8 @@ def image_delete_file():
     if not isAdmin():
         return redirect("/login")
     filename = request.form['filename']
-    head, level, page = parse_content()
-    directory = render_menu(head, level, page)
+    head, level = content_outline()
+    directory = render_menu(head, level, None)
     if filename is None:
         outstring = "no file selected!"
         return set_css() + "<div class='container'><nav>" + \
@@ -1307,8 +1703,8 @@ def image_doDelete():
                 outstring += filename[index] + " deleted!<br />"
             except:
                 outstring += filename[index] + "Error, can not delete files!<br />"
-    head, level, page = parse_content()
-    directory = render_menu(head, level, page)
+    head, level = content_outline()
+    directory = render_menu(head, level, None)
     return set_css() + "<div class='container'><nav>" + \
              directory + "</nav><section><h1>Image List</h1>" + \
              outstring + "<br/><br /></body></html>"
@@ -1368,100 +1764,99 @@ def image_list():
     totalpage = math.ceil(total_rows/int(item_per_page))
     starti = int(item_per_page) * (int(page) - 1) + 1
     endi = starti + int(item_per_page) - 1
-    outstring = "<form method='post' action='image_delete_file'>"
+    outstring = ["<form method='post' action='image_delete_file'>"]
     notlast = False
     if total_rows > 0:
-        outstring += "<br />"
+        outstring.append("<br />")
         if (int(page) * int(item_per_page)) < total_rows:
             notlast = True
         if int(page) > 1:
-            outstring += "<a href='"
-            outstring += "image_list?&amp;page=1&amp;item_per_page=" + \
-                              str(item_per_page) + "&amp;keyword=" + str(session.get('image_keyword'))
-            outstring += "'><<</a> "
+            outstring.append("<a href='")
+            outstring.append("image_list?&amp;page=1&amp;item_per_page=" + \
+                              str(item_per_page) + "&amp;keyword=" + str(session.get('image_keyword')))
+            outstring.append("'><<</a> ")
             page_num = int(page) - 1
-            outstring += "<a href='"
-            outstring += "image_list?&amp;page=" + str(page_num) + \
+            outstring.append("<a href='")
+            outstring.append("image_list?&amp;page=" + str(page_num) + \
                               "&amp;item_per_page=" + str(item_per_page) + \
-                              "&amp;keyword=" + str(session.get('image_keyword'))
-            outstring += "'>Previous</a> "
+                              "&amp;keyword=" + str(session.get('image_keyword')))
+            outstring.append("'>Previous</a> ")
         span = 10
         for index in range(int(page)-span, int(page)+span):
             if index >= 0 and index < totalpage:
                 page_now = index + 1 
                 if page_now == int(page):
-                    outstring += "<font size='+1' color='red'>" + str(page) + " </font>"
+                    outstring.append("<font size='+1' color='red'>" + str(page) + " </font>")
                 else:
-                    outstring += "<a href='"
-                    outstring += "image_list?&amp;page=" + str(page_now) + \
+                    outstring.append("<a href='")
+                    outstring.append("image_list?&amp;page=" + str(page_now) + \
                                       "&amp;item_per_page=" + str(item_per_page) + \
-                                      "&amp;keyword=" + str(session.get('image_keyword'))
-                    outstring += "'>" + str(page_now) + "</a> "
+                                      "&amp;keyword=" + str(session.get('image_keyword')))
+                    outstring.append("'>" + str(page_now) + "</a> ")
 
         if notlast == True:
             nextpage = int(page) + 1
-            outstring += " <a href='"
-            outstring += "image_list?&amp;page=" + str(nextpage) + \
+            outstring.append(" <a href='")
+            outstring.append("image_list?&amp;page=" + str(nextpage) + \
                               "&amp;item_per_page=" + str(item_per_page) + \
-                              "&amp;keyword=" + str(session.get('image_keyword'))
-            outstring += "'>Next</a>"
-            outstring += " <a href='"
-            outstring += "image_list?&amp;page=" + str(totalpage) + \
+                              "&amp;keyword=" + str(session.get('image_keyword')))
+            outstring.append("'>Next</a>")
+            outstring.append(" <a href='")
+            outstring.append("image_list?&amp;page=" + str(totalpage) + \
                               "&amp;item_per_page=" + str(item_per_page) + \
-                              "&amp;keyword=" + str(session.get('image_keyword'))
-            outstring += "'>>></a><br /><br />"
+                              "&amp;keyword=" + str(session.get('image_keyword')))
+            outstring.append("'>>></a><br /><br />")
         if (int(page) * int(item_per_page)) < total_rows:
             notlast = True
-            outstring += imagelist_access_list(files, starti, endi) + "<br />"
+            outstring.append(imagelist_access_list(files, starti, endi) + "<br />")
         else:
-            outstring += "<br /><br />"
-            outstring += imagelist_access_list(files, starti, total_rows) + "<br />"
+            outstring.append("<br /><br />")
+            outstring.append(imagelist_access_list(files, starti, total_rows) + "<br />")
         
         if int(page) > 1:
-            outstring += "<a href='"
-            outstring += "image_list?&amp;page=1&amp;item_per_page=" + \
-                              str(item_per_page) + "&amp;keyword=" + str(session.get('image_keyword'))
-            outstring += "'><<</a> "
+            outstring.append("<a href='")
+            outstring.append("image_list?&amp;page=1&amp;item_per_page=" + \
+                              str(item_per_page) + "&amp;keyword=" + str(session.get('image_keyword')))
+            outstring.append("'><<</a> ")
             page_num = int(page) - 1
-            outstring += "<a href='"
-            outstring += "image_list?&amp;page=" + str(page_num) + \
+            outstring.append("<a href='")
+            outstring.append("image_list?&amp;page=" + str(page_num) + \
                               "&amp;item_per_page=" + str(item_per_page) + \
-                              "&amp;keyword=" + str(session.get('image_keyword'))
-            outstring += "'>Previous</a> "
+                              "&amp;keyword=" + str(session.get('image_keyword')))
+            outstring.append("'>Previous</a> ")
         span = 10
         for index in range(int(page)-span, int(page)+span):
             if index >=0 and index < totalpage:
                 page_now = index + 1
                 if page_now == int(page):
-                    outstring += "<font size='+1' color='red'>" + str(page) + " </font>"
+                    outstring.append("<font size='+1' color='red'>" + str(page) + " </font>")
                 else:
-                    outstring += "<a href='"
-                    outstring += "image_list?&amp;page=" + str(page_now) + \
+                    outstring.append("<a href='")
+                    outstring.append("image_list?&amp;page=" + str(page_now) + \
                                       "&amp;item_per_page=" + str(item_per_page) + \
-                                      "&amp;keyword=" + str(session.get('image_keyword'))
-                    outstring += "'>"+str(page_now) + "</a> "
+                                      "&amp;keyword=" + str(session.get('image_keyword')))
+                    outstring.append("'>"+str(page_now) + "</a> ")
         if notlast == True:
             nextpage = int(page) + 1
-            outstring += " <a href='"
-            outstring += "image_list?&amp;page=" + str(nextpage) + \
+            outstring.append(" <a href='")
+            outstring.append("image_list?&amp;page=" + str(nextpage) + \
                               "&amp;item_per_page=" + str(item_per_page) + \
-                              "&amp;keyword=" + str(session.get('image_keyword'))
-            outstring += "'>Next</a>"
-            outstring += " <a href='"
-            outstring += "image_list?&amp;page=" + str(totalpage) + \
+                              "&amp;keyword=" + str(session.get('image_keyword')))
+            outstring.append("'>Next</a>")
+            outstring.append(" <a href='")
+            outstring.append("image_list?&amp;page=" + str(totalpage) + \
                               "&amp;item_per_page=" + str(item_per_page) + \
-                              "&amp;keyword=" + str(session.get('image_keyword'))
-            outstring += "'>>></a>"
+                              "&amp;keyword=" + str(session.get('image_keyword')))
+            outstring.append("'>>></a>")
     else:
-        outstring += "no data!"
-    outstring += "<br /><br /><input type='submit' value='delete'><input type='reset' value='reset'></form>"
+        outstring.append("no data!")
+    outstring.append("<br /><br /><input type='submit' value='delete'><input type='reset' value='reset'></form>")
 
-    head, level, page = parse_content()
-    directory = render_menu(head, level, page)
+    head, level = content_outline()
+    directory = render_menu(head, level, None)
 
-    return set_css() + "<div class='container'><nav>"+ \
-             directory + "</nav><section><h1>Image List</h1>" + \
-             outstring + "<br/><br /></body></html>"
+    return stream_html(set_css(), "<div class='container'><nav>", directory,
+                       "</nav><section><h1>Image List</h1>", outstring, "<br/><br /></body></html>")
 
 
 @app.route('/imageaxupload', methods=['POST'])
@@ -1496,18 +1891,18 @@ def imagelist_access_list(files, starti, endi):
     # popup window to view images, video or STL files, other files can be downloaded directly
     # files are all the data to list, from starti to endi
     # add file size
-    outstring = ""
+    outstring = []
     for index in range(int(starti)-1, int(endi)):
         fileName, fileExtension = os.path.splitext(files[index])
         fileExtension = fileExtension.lower()
         fileSize = sizeof_fmt(os.path.getsize(image_dir + "/" + files[index]))
         # images files
         if fileExtension == ".png" or fileExtension == ".jpg" or fileExtension == ".gif":
-            outstring += '<input type="checkbox" name="filename" value="' + files[index] + \
+            outstring.append('<input type="checkbox" name="filename" value="' + files[index] + \
                               '"><a href="javascript:;" onClick="window.open(\'/images/' + \
                               files[index] + '\',\'images\', \'catalogmode\',\'scrollbars\')">' + \
-                              files[index] + '</a> (' + str(fileSize) + ')<br />'
-    return outstring
+                              files[index] + '</a> (' + str(fileSize) + ')<br />')
+    return "".join(outstring)
 
 
 # 與 file_selector 搭配的取影像檔程式
@@ -1516,7 +1911,7 @@ def imageselect_access_list(files, starti, endi):
     """Access selected image file
     """
 
-    outstring = '''<head>
+    outstring = ['''<head>
 <style>
 a.xhfbfile {padding: 0 2px 0 0; line-height: 1em;}
 a.xhfbfile img{border: none; margin: 6px;}
@@ -1536,16 +1931,16 @@ a.xhfbfile:hover{
 }
 </style>
 </head>
-'''
+''']
     for index in range(int(starti)-1, int(endi)):
         fileName, fileExtension = os.path.splitext(files[index])
         fileSize = os.path.getsize(image_dir+"/"+files[index])
-        outstring += '''<a class="xhfbfile" href="#" onclick='window.setLink("/images/'''+ \
+        outstring.append('''<a class="xhfbfile" href="#" onclick='window.setLink("/images/'''+ \
                           files[index] + '''",0); return false;'>''' + \
                           files[index] + '''<span style="position: absolute; z-index: 4;"><br /> \
                           <img src="/images/''' + files[index] + '''" width="150px"/></span></a> \
-                          (''' + str(sizeof_fmt(fileSize)) + ''')<br />'''
-    return outstring
+                          (''' + str(sizeof_fmt(fileSize)) + ''')<br />''')
+    return "".join(outstring)
 
 
 @app.route('/imageuploadform', defaults={'edit': 1})
@@ -1556,8 +1951,8 @@ def imageuploadform(edit):
     """
 
     if isAdmin():
-        head, level, page = parse_content()
-        directory = render_menu(head, level, page)
+        head, level = content_outline()
+        directory = render_menu(head, level, None)
         return set_css() + "<div class='container'><nav>" + \
                  directory + "</nav><section><h1>image files upload</h1>" + '''
 <script src="/static/jquery.js" type="text/javascript"></script>
@@ -1591,38 +1986,10 @@ def index():
     """Index page of dynamic site
     """
 
-    head, level, page = parse_content()
+    head, level = content_outline()
     # 2018.12.13, 將空白轉為"+" 號, 會導致連線錯誤, 改為直接取頁面標題
     #return redirect("/get_page/" + urllib.parse.quote_plus(head[0], encoding="utf-8"))
     return redirect("/get_page/" + head[0])
-    # the following will never execute
-    directory = render_menu(head, level, page)
-    if heading is None:
-        heading = head[0]
-    # 因為同一 heading 可能有多頁, 因此不可使用 head.index(heading) 搜尋 page_order
-    page_order_list, page_content_list = search_content(head, page, heading)
-    return_content = ""
-    for i in range(len(page_order_list)):
-        #page_order = head.index(heading)
-        page_order = page_order_list[page_order_list[i]]
-        if page_order == 0:
-            last_page = ""
-        else:
-            last_page = head[page_order-1] + " << <a href='/get_page/" + \
-                             head[page_order-1] + "'>Previous</a>"
-        if page_order == len(head) - 1:
-            # no next page
-            next_page = ""
-        else:
-            next_page = "<a href='/get_page/" + head[page_order+1] + \
-                              "'>Next</a> >> " + head[page_order+1]
-        return_content += last_page + " " + next_page + "<br /><h1>" + \
-                                  heading + "</h1>" + page_content_list[page_order_list[i]] + \
-                                  "<br />" + last_page + " " + next_page
-
-    return set_css() + "<div class='container'><nav>" + \
-             directory + "</nav><section>" + return_content + "</section></div></body></html>"
-
 
 def isAdmin():
 
@@ -1645,6 +2012,21 @@ def listdir():
     return download_dir + "," + config_dir
 
 
+def load_generate_manifest():
+
+    """Load config/generate.json written by the last generate_pages
+    """
+
+    try:
+        with open(config_dir + "generate.json", "r", encoding="utf-8") as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(manifest, dict) or not isinstance(manifest.get("pages"), dict):
+        return {}
+    return manifest
+
+
 @app.route('/load_list')
 def load_list(item_per_page=5, page=1, filedir=None, keyword=None):
 
@@ -1661,7 +2043,7 @@ def load_list(item_per_page=5, page=1, filedir=None, keyword=None):
     totalpage = math.ceil(total_rows/int(item_per_page))
     starti = int(item_per_page) * (int(page) - 1) + 1
     endi = starti + int(item_per_page) - 1
-    outstring = '''<script>
+    outstring = ['''<script>
 function keywordSearch(){
     var oform = document.forms["searchform"];
     // 取elements集合中 name 屬性為 keyword 的值
@@ -1676,90 +2058,90 @@ function keywordSearch(){
     <input type="text" id="keyword" />
     <input type="button" id="send" value="查詢" onClick="keywordSearch()"/> 
     </form>
-'''
-    outstring += "<form name='filelist' method='post' action=''>"
+''']
+    outstring.append("<form name='filelist' method='post' action=''>")
     notlast = False
     if total_rows > 0:
         # turn off the page selector on top
         '''
-        outstring += "<br />"
+        outstring.append("<br />")
         if (int(page) * int(item_per_page)) < total_rows:
             notlast = True
         if int(page) > 1:
-            outstring += "<a href='"
-            outstring += "brython?&amp;page=1&amp;item_per_page="+str(item_per_page)+"&amp;keyword="+str(session.get('search_keyword'))
-            outstring += "'>{{</a> "
+            outstring.append("<a href='")
+            outstring.append("brython?&amp;page=1&amp;item_per_page="+str(item_per_page)+"&amp;keyword="+str(session.get('search_keyword')))
+            outstring.append("'>{{</a> ")
             page_num = int(page) - 1
-            outstring += "<a href='"
-            outstring += "brython?&amp;page="+str(page_num)+"&amp;item_per_page="+str(item_per_page)+"&amp;keyword="+str(session.get('search_keyword'))
-            outstring += "'>Previous</a> "
+            outstring.append("<a href='")
+            outstring.append("brython?&amp;page="+str(page_num)+"&amp;item_per_page="+str(item_per_page)+"&amp;keyword="+str(session.get('search_keyword')))
+            outstring.append("'>Previous</a> ")
         span = 10
         for index in range(int(page)-span, int(page)+span):
             if index>= 0 and index< totalpage:
                 page_now = index + 1 
                 if page_now == int(page):
-                    outstring += "<font size='+1' color='red'>"+str(page)+" </font>"
+                    outstring.append("<font size='+1' color='red'>"+str(page)+" </font>")
                 else:
-                    outstring += "<a href='"
-                    outstring += "brython?&amp;page="+str(page_now)+"&amp;item_per_page="+str(item_per_page)+"&amp;keyword="+str(session.get('search_keyword'))
-                    outstring += "'>"+str(page_now)+"</a> "
+                    outstring.append("<a href='")
+                    outstring.append("brython?&amp;page="+str(page_now)+"&amp;item_per_page="+str(item_per_page)+"&amp;keyword="+str(session.get('search_keyword')))
+                    outstring.append("'>"+str(page_now)+"</a> ")
 
         if notlast == True:
             nextpage = int(page) + 1
-            outstring += " <a href='"
-            outstring += "brython?&amp;page="+str(nextpage)+"&amp;item_per_page="+str(item_per_page)+"&amp;keyword="+str(session.get('search_keyword'))
-            outstring += "'>Next</a>"
-            outstring += " <a href='"
-            outstring += "brython?&amp;page="+str(totalpage)+"&amp;item_per_page="+str(item_per_page)+"&amp;keyword="+str(session.get('search_keyword'))
-            outstring += "'>}}</a><br /><br />"
+            outstring.append(" <a href='")
+            outstring.append("brython?&amp;page="+str(nextpage)+"&amp;item_per_page="+str(item_per_page)+"&amp;keyword="+str(session.get('search_keyword')))
+            outstring.append("'>Next</a>")
+            outstring.append(" <a href='")
+            outstring.append("brython?&amp;page="+str(totalpage)+"&amp;item_per_page="+str(item_per_page)+"&amp;keyword="+str(session.get('search_keyword')))
+            outstring.append("'>}}</a><br /><br />")
         '''
         if (int(page) * int(item_per_page)) < total_rows:
             notlast = True
-            outstring += loadlist_access_list(files, starti, endi, filedir) + "<br />"
+            outstring.append(loadlist_access_list(files, starti, endi, filedir) + "<br />")
         else:
-            outstring += "<br /><br />"
-            outstring += loadlist_access_list(files, starti, total_rows, filedir) + "<br />"
+            outstring.append("<br /><br />")
+            outstring.append(loadlist_access_list(files, starti, total_rows, filedir) + "<br />")
         
         if int(page) > 1:
-            outstring += "<a href='"
-            outstring += "/"+filedir + "?&amp;page=1&amp;item_per_page=" + str(item_per_page)+"&amp;keyword=" + str(session.get('search_keyword'))
-            outstring += "'>{{</a> "
+            outstring.append("<a href='")
+            outstring.append("/"+filedir + "?&amp;page=1&amp;item_per_page=" + str(item_per_page)+"&amp;keyword=" + str(session.get('search_keyword')))
+            outstring.append("'>{{</a> ")
             page_num = int(page) - 1
-            outstring += "<a href='"
-            outstring += "/"+filedir + "?&amp;page=" + str(page_num)+"&amp;item_per_page=" + \
-                              str(item_per_page) + "&amp;keyword=" + str(session.get('search_keyword'))
-            outstring += "'>Previous</a> "
+            outstring.append("<a href='")
+            outstring.append("/"+filedir + "?&amp;page=" + str(page_num)+"&amp;item_per_page=" + \
+                              str(item_per_page) + "&amp;keyword=" + str(session.get('search_keyword')))
+            outstring.append("'>Previous</a> ")
         span = 5
         for index in range(int(page)-span, int(page)+span):
         #for ($j=$page-$range;$j<$page+$range;$j++)
             if index >=0 and index < totalpage:
                 page_now = index + 1
                 if page_now == int(page):
-                    outstring += "<font size='+1' color='red'>" + str(page) + " </font>"
+                    outstring.append("<font size='+1' color='red'>" + str(page) + " </font>")
                 else:
-                    outstring += "<a href='"
-                    outstring += "/" + filedir + "?&amp;page=" + str(page_now) + \
+                    outstring.append("<a href='")
+                    outstring.append("/" + filedir + "?&amp;page=" + str(page_now) + \
                                       "&amp;item_per_page=" + str(item_per_page) + \
-                                      "&amp;keyword="+str(session.get('search_keyword'))
-                    outstring += "'>" + str(page_now) + "</a> "
+                                      "&amp;keyword="+str(session.get('search_keyword')))
+                    outstring.append("'>" + str(page_now) + "</a> ")
         if notlast == True:
             nextpage = int(page) + 1
-            outstring += " <a href='"
-            outstring += "/" + filedir + "?&amp;page=" + str(nextpage) + \
+            outstring.append(" <a href='")
+            outstring.append("/" + filedir + "?&amp;page=" + str(nextpage) + \
                               "&amp;item_per_page=" + str(item_per_page) + \
-                              "&amp;keyword=" + str(session.get('search_keyword'))
-            outstring += "'>Next</a>"
-            outstring += " <a href='"
-            outstring += "/" + filedir + "?&amp;page=" + str(totalpage) + \
+                              "&amp;keyword=" + str(session.get('search_keyword')))
+            outstring.append("'>Next</a>")
+            outstring.append(" <a href='")
+            outstring.append("/" + filedir + "?&amp;page=" + str(totalpage) + \
                               "&amp;item_per_page=" + str(item_per_page) + \
-                              "&amp;keyword=" + str(session.get('search_keyword'))
-            outstring += "'>}}</a>"
+                              "&amp;keyword=" + str(session.get('search_keyword')))
+            outstring.append("'>}}</a>")
     else:
-        outstring += "no data!"
+        outstring.append("no data!")
     #outstring += "<br /><br /><input type='submit' value='load'><input type='reset' value='reset'></form>"
-    outstring += "<br /><br /></form>"
+    outstring.append("<br /><br /></form>")
 
-    return outstring
+    return "".join(outstring)
 
 
 def loadlist_access_list(files, starti, endi, filedir):
@@ -1771,32 +2153,32 @@ def loadlist_access_list(files, starti, endi, filedir):
     # popup window to view images, video or STL files, other files can be downloaded directly
     # files are all the data to list, from starti to endi
     # add file size
-    outstring = ""
+    outstring = []
     for index in range(int(starti)-1, int(endi)):
         fileName, fileExtension = os.path.splitext(files[index])
         fileExtension = fileExtension.lower()
         fileSize = sizeof_fmt(os.path.getsize(config_dir + filedir + "_programs/" + files[index]))
         # images files
         if fileExtension == ".png" or fileExtension == ".jpg" or fileExtension == ".gif":
-            outstring += '<input type="checkbox" name="filename" value="' + files[index] + \
+            outstring.append('<input type="checkbox" name="filename" value="' + files[index] + \
                               '"><a href="javascript:;" onClick="window.open(\'/downloads/'+ \
-                            files[index] + '\',\'images\', \'catalogmode\',\'scrollbars\')">' + files[index] + '</a> (' + str(fileSize) + ')<br />'
+                            files[index] + '\',\'images\', \'catalogmode\',\'scrollbars\')">' + files[index] + '</a> (' + str(fileSize) + ')<br />')
         # stl files
         elif fileExtension == ".stl":
-            outstring += '<input type="checkbox" name="filename" value="' + files[index] + '"><a href="javascript:;" onClick="window.open(\'/static/viewstl.html?src=/static/' +  \
-            files[index] + '\',\'images\', \'catalogmode\',\'scrollbars\')">' + files[index] + '</a> ('+str(fileSize)+')<br />'
+            outstring.append('<input type="checkbox" name="filename" value="' + files[index] + '"><a href="javascript:;" onClick="window.open(\'/static/viewstl.html?src=/static/' +  \
+            files[index] + '\',\'images\', \'catalogmode\',\'scrollbars\')">' + files[index] + '</a> ('+str(fileSize)+')<br />')
         # flv files
         elif fileExtension == ".flv":
-            outstring += '<input type="checkbox" name="filename" value="' + files[index] + '"><a href="javascript:;" onClick="window.open(\'/flvplayer?filepath=/downloads/' +  \
-            files[index]+'\',\'images\', \'catalogmode\',\'scrollbars\')">' + files[index] + '</a> ('+str(fileSize)+')<br />'
+            outstring.append('<input type="checkbox" name="filename" value="' + files[index] + '"><a href="javascript:;" onClick="window.open(\'/flvplayer?filepath=/downloads/' +  \
+            files[index]+'\',\'images\', \'catalogmode\',\'scrollbars\')">' + files[index] + '</a> ('+str(fileSize)+')<br />')
         # py files
         elif fileExtension == ".py":
-            outstring += '<input type="radio" name="filename" value="' + files[index] + '">' + files[index] + ' (' + str(fileSize) + ')<br />'
+            outstring.append('<input type="radio" name="filename" value="' + files[index] + '">' + files[index] + ' (' + str(fileSize) + ')<br />')
         # direct download files
         else:
-            outstring += "<input type='checkbox' name='filename' value='" + files[index] + \
-                             "'><a href='/" + filedir + "_programs/" + files[index] + "'>" + files[index] + "</a> (" + str(fileSize) + ")<br />"
-    return outstring
+            outstring.append("<input type='checkbox' name='filename' value='" + files[index] + \
+                             "'><a href='/" + filedir + "_programs/" + files[index] + "'>" + files[index] + "</a> (" + str(fileSize) + ")<br />")
+    return "".join(outstring)
 
 
 @app.route('/login')
@@ -1805,8 +2187,8 @@ def login():
     """Login routine
     """
 
-    head, level, page = parse_content()
-    directory = render_menu(head, level, page)
+    head, level = content_outline()
+    directory = render_menu(head, level, None)
     if not isAdmin():
         return set_css() + "<div class='container'><nav>" + \
                  directory + "</nav><section><h1>Login</h1><form method='post' action='checkLogin'> \
@@ -1836,8 +2218,8 @@ def local_blog():
 
     if isAdmin():
         os.system("pelican markdown -o blog -s local_publishconf.py")
-        head, level, page = parse_content()
-        directory = render_menu(head, level, page)
+        head, level = content_outline()
+        directory = render_menu(head, level, None)
 
         return set_css() + "<div class='container'><nav>" + \
                    directory + "</nav><section><h1>Local blog generated</h1>" + \
@@ -1868,8 +2250,8 @@ def markdown_action():
         with open(filename, 'w', encoding='utf-8') as file:
             file.write(body.replace('\r\n', '\n'))
 
-        head, level, page = parse_content()
-        directory = render_menu(head, level, page)
+        head, level = content_outline()
+        directory = render_menu(head, level, None)
 
         return set_css() + "<div class='container'><nav>" + \
                    directory + "</nav><section><h1>Markdown saved</h1>" + \
@@ -1889,8 +2271,8 @@ def markdown_form():
             file_to_edit = request.args.get('file')
         except:
             file_to_edit = ""
-        head, level, page = parse_content()
-        directory = render_menu(head, level, page)
+        head, level = content_outline()
+        directory = render_menu(head, level, None)
         markdown_dir = _curdir + "/markdown/"
         filenames = [filename for filename in os.listdir(markdown_dir) if filename.endswith('.md')] if os.path.exists(markdown_dir) else []
         file_list = 'Existed Files: '
@@ -1951,59 +2333,253 @@ Solid Edge
         return redirect("/login")
 
 
-def parse_config():
+def menu_hash(head, level):
 
-    """Parse config
+    """Return the hash of the heading structure a menu is built from
     """
 
-    # if there is no config/config automatically generate one with content "admin"
-    if not os.path.isfile(config_dir+"config"):
-        # create config file if there is no config file
-        # default password is admin
-        password = "admin"
-        hashed_password = hashlib.sha512(password.encode('utf-8')).hexdigest()
-        with open(config_dir + "config", "w", encoding="utf-8") as f:
-            f.write(hashed_password)
+    digest = hashlib.sha1()
+    for v, l in zip(head, level):
+        digest.update((l + v + "\0").encode("utf-8"))
+    return digest.hexdigest()
 
-    # if there is no config/sitetitle automatically generate one with content "cmsimde"
-    if not os.path.isfile(config_dir+"sitetitle"):
-        # default sitetitle is "cmsimde"
-        with open(config_dir + "sitetitle", "w", encoding="utf-8") as f:
-            f.write("cmsimde")
 
-    # read site_title from config/sitetitle
-    site_title = file_get_contents(config_dir + "sitetitle")
-    password = file_get_contents(config_dir + "config")
+def normalize_content(subject):
 
-    return site_title, password
+    """Normalize h1, h2 and h3 tags of content before saving to content.htm
+    """
 
+    # 與 file_get_contents() 讀檔時相同, 將跳行統一為 \n, content.htm 的 byte 位置才能與頁面內容對應
+    subject = subject.replace("\r\n", "\n").replace("\r", "\n")
+    # _remove_h123_attrs 處理排序第一且內容超過一個元件的標題時, 需要第二次才能整理完成
+    # 因此重複處理直到內容不再改變
+    for i in range(3):
+        soup = bs4.BeautifulSoup(subject, 'html.parser')
+        normalized = _remove_h123_attrs(soup).decode()
+        if normalized == subject:
+            break
+        subject = normalized
+    return normalized
 
-def _remove_h123_attrs(soup):
 
-    """Remove h1-h3 tag attribute
+def normalize_page(page, page_order):
+
+    """Normalize one edited page the way normalize_content() would inside content.htm
+
+    頁面開頭不是標題時, 其內容屬於前一頁, 傳回 None 表示必須將所有頁面重新存檔
     """
 
-    tag_order = 0
-    for tag in soup.find_all(['h1', 'h2', 'h3']):
-        # 假如標註內容沒有字串
-        #if len(tag.text) == 0:
-        if len(tag.contents) ==0:
-            # 且該標註為排序第一
-            if tag_order == 0:
-                tag.string = "First"
-            else:
-          # 若該標註非排序第一, 則移除無內容的標題標註
-                tag.extract()
-        # 針對單一元件的標題標註
-        elif len(tag.contents) == 1:
-            # 若內容非為純文字, 表示內容為其他標註物件
-            if tag.get_text() == "":
-                # 且該標註為排序第一
-                if tag_order == 0:
-                    # 在最前方插入標題
-                    tag.insert_before(soup.new_tag('h1', 'First'))
-                else:
-                    # 移除 h1, h2 或 h3 標註, 只留下內容
+    if page_order == 0:
+        page = normalize_content(page)
+    else:
+        # 前方先加上一個標題, 編輯頁面的標題才不會被當作第一個標題處理
+        prefix = "<h1>First</h1>"
+        page = normalize_content(prefix + page)
+        if not page.startswith(prefix):
+            return None
+        page = page[len(prefix):]
+    if not re.match(r"<h[1-3]>", page):
+        return None
+    return page
+
+
+def number_duplicates(head):
+
+    """Append -1, -2... to repeated headings in head for static file names
+    """
+
+    newhead = []
+    for v, (count, totalcount) in zip(head, duplicate_counts(head)):
+        # 針對重複標題者, 附加目前重複標題出現數, 未重複採原標題
+        newhead.append(v + "-" + str(count) if totalcount > 1 else v)
+    return newhead
+
+
+def page_index():
+
+    """Return the page index of content.htm
+
+    index 存於 config/content.idx, content.htm 的 signature 改變時重新建立
+    content.htm 未經 normalize_content() 整理時傳回 None, 由 parse_content() 處理
+    """
+
+    signature = list(content_signature())
+    index = _content_cache.get("index")
+    if index is None or index["signature"] != signature:
+        with _content_cache_lock:
+            index = _content_cache.get("index")
+            if index is None or index["signature"] != signature:
+                index = _load_page_index(signature)
+                _content_cache["index"] = index
+    if index["head"] is None:
+        return None
+    return index
+
+
+def _load_page_index(signature):
+
+    """Load config/content.idx or rebuild it from content.htm
+    """
+
+    storage = content_storage()
+    if storage is not None:
+        # 資料庫中各頁面獨立存放, 只需標題, 階次與 hash
+        index = storage.outline()
+        if not index["head"]:
+            return {"signature": signature, "head": None}
+        index["signature"] = signature
+        index["menu"] = {}
+        return index
+    try:
+        with open(config_dir + "content.idx", encoding="utf-8") as file:
+            index = json.load(file)
+        if index.get("signature") == signature:
+            index["menu"] = {}
+            return index
+    except (OSError, ValueError):
+        pass
+    with open(config_dir + "content.htm", "rb") as file:
+        subject = file.read().decode("utf-8")
+    index = build_page_index(subject)
+    if index is None:
+        # 記錄此 signature 無法建立 index, 避免每次都重新解析
+        return {"signature": signature, "head": None}
+    index["signature"] = signature
+    _atomic_write(config_dir + "content.idx", json.dumps(index, ensure_ascii=False))
+    index["menu"] = {}
+    return index
+
+
+def page_editors(directory, heading, level, page_order_list, page_content_list, links):
+
+    """Return a tinymce editor for each page of heading, led by its Previous and Next links
+
+    每頁只 escape 一次自己的內容, 所有編輯器共用同一份 admin css 與 editor shell
+    """
+
+    editor = set_admin_css() + editor_shell()
+    outstring = []
+    for page_order, page_content, link in zip(page_order_list, page_content_list, links):
+        pagedata = "<h" + level[page_order] + ">" + heading + "</h" + level[page_order] + ">" + page_content
+        # 利用 html_escape() 將 specialchar 轉成只能顯示的格式
+        outstring.append(link + "<br />" + tinymce_editor(directory, html_escape(pagedata), page_order, editor))
+    return outstring
+
+
+def page_neighbours(head):
+
+    """Return the (previous, next) heading of each page order, None at both ends
+
+    同一版本的標題數列只建立一次, 供 get_page 與 get_page2 產生 Previous 與 Next 連結
+    """
+
+    entry = _head_entry(head)
+    neighbours = entry.get("neighbours")
+    if neighbours is None:
+        neighbours = list(zip([None] + head[:-1], head[1:] + [None]))
+        entry["neighbours"] = neighbours
+    return neighbours
+
+
+def page_texts(page, orders=None):
+
+    """Return the visible text of the pages of parse_content() at orders, all pages by default
+
+    每個頁面的文字依 sha1 只取一次, 靜態網頁, tipue search 與 doSearch 共用
+    """
+
+    global _page_text_cache
+    cache = _page_text_cache
+    if cache["page"] is not page:
+        # 內容改變後, 未修改的頁面沿用之前取出的文字
+        hashes = [page_hash(w) for w in page]
+        texts = cache["text"]
+        cache = {"page": page, "hash": hashes, "text": {h: texts[h] for h in hashes if h in texts}}
+        _page_text_cache = cache
+    if orders is None:
+        orders = range(len(page))
+    outstring = []
+    for i in orders:
+        text = cache["text"].get(cache["hash"][i])
+        if text is None:
+            text = visible_text(page[i])
+            cache["text"][cache["hash"][i]] = text
+        outstring.append(text)
+    return outstring
+
+
+def parse_config():
+
+    """Parse config
+
+    結果依 config/config 與 config/sitetitle 的 mtime 快取, 每 init.Init.config_cache_seconds 秒才檢查一次檔案,
+    saveConfig 存檔後由 clear_config_cache() 立即失效
+    """
+
+    global _config_cache
+    cache = _config_cache
+    now = time.monotonic()
+    if cache is not None and cache["config_dir"] == config_dir and \
+            now - cache["checked"] < getattr(init.Init, "config_cache_seconds", 2):
+        return cache["site_title"], cache["password"]
+    signature = [_file_signature(config_dir + "config"), _file_signature(config_dir + "sitetitle")]
+    if cache is not None and cache["config_dir"] == config_dir and cache["signature"] == signature:
+        cache["checked"] = now
+        return cache["site_title"], cache["password"]
+
+    # if there is no config/config automatically generate one with content "admin"
+    if not os.path.isfile(config_dir+"config"):
+        # create config file if there is no config file
+        # default password is admin
+        password = "admin"
+        hashed_password = hashlib.sha512(password.encode('utf-8')).hexdigest()
+        with open(config_dir + "config", "w", encoding="utf-8") as f:
+            f.write(hashed_password)
+
+    # if there is no config/sitetitle automatically generate one with content "cmsimde"
+    if not os.path.isfile(config_dir+"sitetitle"):
+        # default sitetitle is "cmsimde"
+        with open(config_dir + "sitetitle", "w", encoding="utf-8") as f:
+            f.write("cmsimde")
+
+    # read site_title from config/sitetitle
+    site_title = file_get_contents(config_dir + "sitetitle")
+    password = file_get_contents(config_dir + "config")
+    # 產生預設檔案後 signature 已改變, 重新取得
+    if None in signature:
+        signature = [_file_signature(config_dir + "config"), _file_signature(config_dir + "sitetitle")]
+    _config_cache = {"config_dir": config_dir, "signature": signature, "checked": now,
+                     "site_title": site_title, "password": password}
+
+    return site_title, password
+
+
+def _remove_h123_attrs(soup):
+
+    """Remove h1-h3 tag attribute
+    """
+
+    tag_order = 0
+    for tag in soup.find_all(['h1', 'h2', 'h3']):
+        # 假如標註內容沒有字串
+        #if len(tag.text) == 0:
+        if len(tag.contents) ==0:
+            # 且該標註為排序第一
+            if tag_order == 0:
+                tag.string = "First"
+            else:
+          # 若該標註非排序第一, 則移除無內容的標題標註
+                tag.extract()
+        # 針對單一元件的標題標註
+        elif len(tag.contents) == 1:
+            # 若內容非為純文字, 表示內容為其他標註物件
+            if tag.get_text() == "":
+                # 且該標註為排序第一
+                if tag_order == 0:
+                    # 在最前方插入標題
+                    tag.insert_before(soup.new_tag('h1', 'First'))
+                else:
+                    # 移除 h1, h2 或 h3 標註, 只留下內容
                     tag.replaceWithChildren()
             # 表示單一元件的標題標註, 且標題為單一字串者
             else:
@@ -2034,6 +2610,42 @@ def _remove_h123_attrs(soup):
 
 def parse_content():
 
+    """Return head, level and page lists of content.htm
+
+    解析結果依 content.htm 的 stat signature 快取, 內容未變更時不再以 bs4 解析
+    """
+
+    if content_storage() is None and not os.path.isfile(config_dir+"content.htm"):
+        return "Error: no content.htm"
+    entry = _content_cache.get("entry")
+    if entry is not None and entry["signature"] == content_signature():
+        return entry["head"], entry["level"], entry["page"]
+    # content.htm 已有 page index 時, 依各頁面位置切割即可, 不需以 bs4 解析
+    index = page_index() if content_storage() is None else None
+    # 同一時間只讓一個執行緒解析 content.htm, 其餘執行緒等待後直接取用快取
+    with _content_cache_lock:
+        # 在讀檔前取 signature, 若讀檔期間 content.htm 被改寫, 下次呼叫時會重新解析
+        signature = content_signature()
+        entry = _content_cache.get("entry")
+        if entry is not None and entry["signature"] == signature:
+            return entry["head"], entry["level"], entry["page"]
+        result = _parse_content(index)
+        if isinstance(result, str):
+            return result
+        head, level, page = result
+        _content_cache["entry"] = {
+            "signature": signature,
+            "head": head,
+            "level": level,
+            "page": page,
+            # render_menu 依 sitemap 參數存放的選單
+            "menu": {}
+            }
+    return head, level, page
+
+
+def _parse_content(index=None):
+
     """Use bs4 and re module functions to parse content.htm
     """
 
@@ -2050,6 +2662,12 @@ def parse_content():
         library.save(cms)
         library.commit()
     '''
+    storage = content_storage()
+    if storage is not None:
+        head_list, level_list, page_list = storage.load()
+        if not head_list:
+            return "Error: no data in content.db"
+        return head_list, level_list, page_list
     # if no content.htm, generate a head 1 and content 1 file
     if not os.path.isfile(config_dir+"content.htm"):
         return "Error: no content.htm"
@@ -2058,6 +2676,10 @@ def parse_content():
         with open(config_dir + "content.htm", "w", encoding="utf-8") as f:
             f.write("<h1>head 1</h1>content 1")
         '''
+    if index is not None:
+        result = _index_pages(index)
+        if result is not None:
+            return result
     subject = file_get_contents(config_dir+"content.htm")
     # deal with content without content
     if subject == "":
@@ -2068,56 +2690,58 @@ def parse_content():
             f.write("<h1>head 1</h1>content 1")
         subject = "<h1>head 1</h1>content 1"
         '''
-    # initialize the return lists
+    subject, pages = _split_pages(subject)
     head_list = []
     level_list = []
     page_list = []
+    for head, level, start, end in pages:
+        head_list.append(head)
+        level_list.append(level)
+        page_list.append(subject[start:end])
+    return head_list, level_list, page_list
+
+
+def _split_pages(subject):
+
+    """Normalize subject in memory and split it into pages
+    """
+
     # make the soup out of the html content
     soup = bs4.BeautifulSoup(subject, 'html.parser')
     # 嘗試解讀各種情況下的標題
+    # 存檔時已經由 normalize_content() 處理, 這裡只在記憶體中處理, 不再改寫 content.htm
     soup = _remove_h123_attrs(soup)
-    # 改寫 content.htm 後重新取 subject
-    with open(config_dir + "content.htm", "wb") as f:
-        f.write(soup.encode("utf-8"))
-    subject = file_get_contents(config_dir+"content.htm")
+    subject = soup.decode()
     # get all h1, h2, h3 tags into list
     htag= soup.find_all(['h1', 'h2', 'h3'])
-    n = len(htag)
-    # get the page content to split subject using each h tag
-    temp_data = subject.split(str(htag[0]))
-    if len(temp_data) > 2:
-        subject = str(htag[0]).join(temp_data[1:])
-    else:
-        subject = temp_data[1]
-    if n >1:
-            # i from 1 to i-1
-            for i in range(1, len(htag)):
-                head_list.append(htag[i-1].text.strip())
-                # use name attribute of h* tag to get h1, h2 or h3
-                # the number of h1, h2 or h3 is the level of page menu
-                level_list.append(htag[i-1].name[1])
-                temp_data = subject.split(str(htag[i]))
-                if len(temp_data) > 2:
-                    subject = str(htag[i]).join(temp_data[1:])
-                else:
-                    subject = temp_data[1]
-                # cut the other page content out of htag from 1 to i-1
-                cut = temp_data[0]
-                # add the page content
-                page_list.append(cut)
-    # last i
-    # add the last page title
-    head_list.append(htag[n-1].text.strip())
-    # add the last level
-    level_list.append(htag[n-1].name[1])
-    temp_data = subject.split(str(htag[n-1]))
-    # the last subject
-    subject = temp_data[0]
-    # cut the last page content out
-    cut = temp_data[0]
-    # the last page content
-    page_list.append(cut)
-    return head_list, level_list, page_list
+    return subject, split_content(subject, htag)
+
+
+def read_page(index, page_order):
+
+    """Read one page of content.htm using the page index
+
+    以 mmap 只讀取該頁面的 byte 範圍, content.htm 已被改寫而與 index 不符時傳回 None
+    """
+
+    storage = content_storage()
+    if storage is not None:
+        content = storage.page(page_order)
+        if content is None or page_hash(content) != index["hash"][page_order]:
+            return None
+        return content
+    start = index["start"][page_order]
+    end = index["end"][page_order]
+    try:
+        with open(config_dir + "content.htm", "rb") as file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                content = mapped[start:end]
+    except (OSError, ValueError):
+        # 空檔案無法 mmap
+        return None
+    if hashlib.sha1(content).hexdigest() != index["hash"][page_order]:
+        return None
+    return content.decode("utf-8")
 
 
 def remove_special_characters(text):
@@ -2133,19 +2757,52 @@ def remove_special_characters(text):
     return cleaned_text
 
 
+def _cached_menu(render):
+
+    """Memoize a render_menu function on the heading structure and the site title
+
+    選單只與 head, level 及 render_menu2 使用的網站標題有關, 同一內容版本的選單只建立一次
+    """
+
+    @functools.wraps(render)
+    def cached(head, level, page, sitemap=0):
+        # head 與 level 若為 parse_content() 或 page_index() 快取中的數列, 直接取用已建立的選單
+        # 網站標題修改後必須重新建立選單
+        site_title, password = parse_config()
+        variant = (render.__name__, sitemap, site_title)
+        entry = _content_entry(head)
+        if entry is not None and level is not entry["level"]:
+            entry = None
+        if entry is not None and variant in entry["menu"]:
+            return entry["menu"][variant]
+        key = variant + (menu_hash(head, level),)
+        directory = _menu_cache.get(key)
+        if directory is None:
+            directory = render(head, level, page, sitemap)
+            # 只保留最近內容版本的各種選單
+            if len(_menu_cache) >= 16:
+                _menu_cache.clear()
+            _menu_cache[key] = directory
+        if entry is not None:
+            entry["menu"][variant] = directory
+        return directory
+    return cached
+
+
+@_cached_menu
 def render_menu(head, level, page, sitemap=0):
     
     """允許使用者在 h1 標題後直接加上 h3 標題, 或者隨後納入 h4 之後作為標題標註
     """
 
-    directory = ""
+    directory = []
     # 從 level 數列第一個元素作為開端
     current_level = level[0]
     # 若是 sitemap 則僅列出樹狀架構而沒有套用 css3menu 架構
     if sitemap:
-        directory += "<ul>"
+        directory.append("<ul>")
     else:
-        directory += "<ul id='css3menu1' class='topmenu'>"
+        directory.append("<ul id='css3menu1' class='topmenu'>")
     # 逐一配合 level 數列中的各標題階次, 一一建立對應的表單或 sitemap
     for index in range(len(head)):
         # 用 this_level 取出迴圈中逐一處理的頁面對應層級, 注意取出值為 str
@@ -2160,43 +2817,44 @@ def render_menu(head, level, page, sitemap=0):
         # 從正在處理的標題階次與前一個元素比對, 若階次低, 則要加入另一區段的 unordered list 標頭
         # 兩者皆為 str 會轉為整數後比較
         if this_level > current_level:
-            directory += "<ul>"
-            directory += "<li><a href='/get_page/" + head[index] + "'>" + head[index] + "</a>"
+            directory.append("<ul>")
+            directory.append("<li><a href='/get_page/" + head[index] + "'>" + head[index] + "</a>")
         # 假如正在處理的標題與前一個元素同位階, 則必須再判定是否為另一個 h1 的樹狀頭
         elif this_level == current_level:
             # 若正在處理的標題確實為樹狀頭, 則標上樹狀頭開始標註
             if this_level == 1:
                 # 這裡還是需要判定是在建立 sitemap 模式或者選單模式
                 if sitemap:
-                    directory += "<li><a href='/get_page/" + head[index] + "'>" + head[index]+"</a>"
+                    directory.append("<li><a href='/get_page/" + head[index] + "'>" + head[index]+"</a>")
                 else:
-                    directory += "<li class='topmenu'><a href='/get_page/" + head[index] + "'>" + head[index] + "</a>"
+                    directory.append("<li class='topmenu'><a href='/get_page/" + head[index] + "'>" + head[index] + "</a>")
             #  假如不是樹狀頭, 則只列出對應的 list
             else:
-                directory += "<li><a href='/get_page/" + head[index] + "'>" + head[index] + "</a>"
+                directory.append("<li><a href='/get_page/" + head[index] + "'>" + head[index] + "</a>")
         # 假如正處理的元素比上一個元素位階更高, 必須要先關掉前面的低位階區段
         else:
-            directory += "</li>"*(int(current_level) - int(level[index]))
-            directory += "</ul>"*(int(current_level) - int(level[index]))
+            directory.append("</li>"*(int(current_level) - int(level[index])))
+            directory.append("</ul>"*(int(current_level) - int(level[index])))
             if this_level == 1:
                 if sitemap:
-                    directory += "<li><a href='/get_page/" + head[index] + "'>" + head[index] + "</a>"
+                    directory.append("<li><a href='/get_page/" + head[index] + "'>" + head[index] + "</a>")
                 else:
-                    directory += "<li class='topmenu'><a href='/get_page/" + head[index] + "'>" + head[index] + "</a>"
+                    directory.append("<li class='topmenu'><a href='/get_page/" + head[index] + "'>" + head[index] + "</a>")
             else:
-                directory += "<li><a href='/get_page/" + head[index] + "'>" + head[index] + "</a>"
+                directory.append("<li><a href='/get_page/" + head[index] + "'>" + head[index] + "</a>")
         current_level = this_level
-    directory += "</li></ul>"
-    return directory
+    directory.append("</li></ul>")
+    return "".join(directory)
 
 
+@_cached_menu
 def render_menu2(head, level, page, sitemap=0):
 
     """Render menu for static site
     """
 
     site_title, password = parse_config()
-    directory = '''
+    directory = ['''
     <div class="site-wrap">
 
     <div class="site-mobile-menu">
@@ -2223,13 +2881,13 @@ def render_menu2(head, level, page, sitemap=0):
                   -->
                   <div class="col-12 col-md-10 d-none d-xl-block">
                     <nav class="site-navigation position-relative text-right" role="navigation">
-    '''
+    ''']
     
     # 從 level 數列第一個元素作為開端, 第一個一定非 level 1 不可
     current_level = level[0]
     # 若是 sitemap 則僅列出樹狀架構而沒有套用 css3menu 架構
     if sitemap:
-        directory += '''<ul>
+        directory.append('''<ul>
 <li>
 <form>
 <div class="tipue_search_group">
@@ -2237,11 +2895,11 @@ def render_menu2(head, level, page, sitemap=0):
 </div>
 </form>
 </li>
-        '''
+        ''')
     else:
-        directory += '''<ul class='site-menu js-clone-nav mr-auto d-none d-lg-block'>'''
+        directory.append('''<ul class='site-menu js-clone-nav mr-auto d-none d-lg-block'>''')
     # 納入主頁與表單
-    directory += '''
+    directory.append('''
                         <li class="active has-children"><a href="index.html">Home</a>
                         <ul class="dropdown">
                             <li><a href="sitemap.html">SMap</a></li>
@@ -2249,7 +2907,7 @@ def render_menu2(head, level, page, sitemap=0):
                             <li><a href="./../blog/index.html">blog</a></li>
                         </ul>
                       </li>
-                     '''
+                     ''')
     # 逐一配合 level 數列中的各標題階次, 一一建立對應的表單或 sitemap
     for index in range(len(head)):
         # 用 this_level 取出迴圈中逐一處理的頁面對應層級, 注意取出值為 str
@@ -2265,19 +2923,19 @@ def render_menu2(head, level, page, sitemap=0):
         # 兩者皆為 str 會轉為整數後比較
         # 目前的位階在上一個標題之後
         if this_level > current_level:
-            directory += "<ul class='dropdown'>"
+            directory.append("<ul class='dropdown'>")
             # 是否加上 class=has-children, 視下一個而定
             # 目前處理的標題, 並不是最後一個, 因此有下一個標題待處理
             if index < (len(head)-1):
                 next_level = level[index+1]
                 if this_level < next_level:
                     # 表示要加上 class=dropdown
-                    directory += "<li class='has-children'><a href='" + head[index] + ".html'>" + head[index] + "</a>"
+                    directory.append("<li class='has-children'><a href='" + head[index] + ".html'>" + head[index] + "</a>")
                 else:
-                    directory += "<li><a href='" + head[index] + ".html'>" + head[index] + "</a>"
+                    directory.append("<li><a href='" + head[index] + ".html'>" + head[index] + "</a>")
             else:
                 #表示為最後一個
-                directory += "<li><a href='" + head[index] + ".html'>" + head[index] + "</a>"
+                directory.append("<li><a href='" + head[index] + ".html'>" + head[index] + "</a>")
         # 假如正在處理的標題與前一個元素同位階, 則必須再判定是否為另一個 h1 的樹狀頭
         # 目前標題與上一個標題相同
         elif this_level == current_level:
@@ -2287,28 +2945,28 @@ def render_menu2(head, level, page, sitemap=0):
                 next_level = level[index+1]
                 if this_level < next_level:
                     # 表示要加上 class=dropdown
-                    directory += "<li class='has-children'><a href='" + head[index] + ".html'>" + head[index] + "</a>"
+                    directory.append("<li class='has-children'><a href='" + head[index] + ".html'>" + head[index] + "</a>")
                 else:
-                    directory += "<li><a href='" + head[index] + ".html'>" + head[index] + "</a>"
+                    directory.append("<li><a href='" + head[index] + ".html'>" + head[index] + "</a>")
             else:
                 #表示為最後一個
-                directory += "<li><a href='" + head[index] + ".html'>" + head[index] + "</a>"
+                directory.append("<li><a href='" + head[index] + ".html'>" + head[index] + "</a>")
         # 假如正處理的元素比上一個元素位階更高, 必須要先關掉前面的低位階區段
         else:
-            directory += "</li>"*(int(current_level) - int(level[index]))
-            directory += "</ul>"*(int(current_level) - int(level[index]))
+            directory.append("</li>"*(int(current_level) - int(level[index])))
+            directory.append("</ul>"*(int(current_level) - int(level[index])))
             if index < (len(head)-1):
                 next_level = level[index+1]
                 if this_level < next_level:
                     # 表示要加上 class=dropdown
-                    directory += "<li class='has-children'><a href='" + head[index] + ".html'>" + head[index] + "</a>"
+                    directory.append("<li class='has-children'><a href='" + head[index] + ".html'>" + head[index] + "</a>")
                 else:
-                    directory += "<li><a href='" + head[index] + ".html'>" + head[index] + "</a>"
+                    directory.append("<li><a href='" + head[index] + ".html'>" + head[index] + "</a>")
             else:
                 #表示為最後一個
-                directory += "<li><a href='" + head[index] + ".html'>" + head[index] + "</a>"
+                directory.append("<li><a href='" + head[index] + ".html'>" + head[index] + "</a>")
         current_level = this_level
-    directory += '''</li>
+    directory.append('''</li>
                       </ul>
                 </nav>
               </div>
@@ -2319,23 +2977,24 @@ def render_menu2(head, level, page, sitemap=0):
           </div>
           
         </header>
-    '''
-    return directory
+    ''')
+    return "".join(directory)
 
 
+@_cached_menu
 def render_menu3(head, level, page, sitemap=0):
 
     """Render menu for static sitemap
     """
 
-    directory = ""
+    directory = []
     current_level = level[0]
     if sitemap:
-        directory += "<ul>"
+        directory.append("<ul>")
     else:
         # before add tipue search function
         #directory += "<ul id='css3menu1' class='topmenu'>"
-        directory += "<ul id='css3menu1' class='topmenu'><div class=\"tipue_search_group\"><input style=\"width: 6vw;\" type=\"text\" name=\"q\" id=\"tipue_search_input\" pattern=\".{2,}\" title=\"Press enter key to search\" required></div>"
+        directory.append("<ul id='css3menu1' class='topmenu'><div class=\"tipue_search_group\"><input style=\"width: 6vw;\" type=\"text\" name=\"q\" id=\"tipue_search_input\" pattern=\".{2,}\" title=\"Press enter key to search\" required></div>")
     for index in range(len(head)):
         this_level = level[index]
         # 若處理中的層級比上一層級高超過一層, 則將處理層級升級 (處理 h1 後直接接 h3 情況)
@@ -2343,38 +3002,38 @@ def render_menu3(head, level, page, sitemap=0):
             #this_level = str(int(this_level) - 1)
             this_level = str(int(current_level) + 1)
         if this_level > current_level:
-            directory += "<ul>"
+            directory.append("<ul>")
             #directory += "<li><a href='/get_page/"+head[index]+"'>"+head[index]+"</a>"
             # 改為連結到 content/標題.html
-            directory += "<li><a href='" + head[index] + ".html'>" + head[index] + "</a>"
+            directory.append("<li><a href='" + head[index] + ".html'>" + head[index] + "</a>")
         elif this_level == current_level:
             if this_level == 1:
                 if sitemap:
                     # 改為連結到 content/標題.html
                     #directory += "<li><a href='/get_page/"+head[index]+"'>"+head[index]+"</a>"
-                    directory += "<li><a href='" + head[index] + ".html'>" + head[index] + "</a>"
+                    directory.append("<li><a href='" + head[index] + ".html'>" + head[index] + "</a>")
                 else:
                     #directory += "<li class='topmenu'><a href='/get_page/"+head[index]+"'>"+head[index]+"</a>"
-                    directory += "<li class='topmenu'><a href='content/" + head[index] + ".html'>" + head[index] + "</a>"
+                    directory.append("<li class='topmenu'><a href='content/" + head[index] + ".html'>" + head[index] + "</a>")
             else:
                 #directory += "<li><a href='/get_page/"+head[index]+"'>"+head[index]+"</a>"
-                directory += "<li><a href='" + head[index] + ".html'>" + head[index] + "</a>"
+                directory.append("<li><a href='" + head[index] + ".html'>" + head[index] + "</a>")
         else:
-            directory += "</li>"*(int(current_level) - int(level[index]))
-            directory += "</ul>"*(int(current_level) - int(level[index]))
+            directory.append("</li>"*(int(current_level) - int(level[index])))
+            directory.append("</ul>"*(int(current_level) - int(level[index])))
             if this_level == 1:
                 if sitemap:
                     #directory += "<li><a href='/get_page/"+head[index]+"'>"+head[index]+"</a>"
-                    directory += "<li><a href='" + head[index] + ".html'>" + head[index] + "</a>"
+                    directory.append("<li><a href='" + head[index] + ".html'>" + head[index] + "</a>")
                 else:
                     #directory += "<li class='topmenu'><a href='/get_page/"+head[index]+"'>"+head[index]+"</a>"
-                    directory += "<li class='topmenu'><a href='" + head[index] + ".html'>" + head[index] + "</a>"
+                    directory.append("<li class='topmenu'><a href='" + head[index] + ".html'>" + head[index] + "</a>")
             else:
                 #directory += "<li><a href='/get_page/"+head[index]+"'>"+head[index]+"</a>"
-                directory += "<li><a href='" + head[index] + ".html'>" + head[index] + "</a>"
+                directory.append("<li><a href='" + head[index] + ".html'>" + head[index] + "</a>")
         current_level = this_level
-    directory += "</li></ul>"
-    return directory
+    directory.append("</li></ul>")
+    return "".join(directory)
 
 
 @app.route('/saveConfig', methods=['POST'])
@@ -2391,8 +3050,8 @@ def saveConfig():
     if site_title is None or password is None:
         return error_log("no content to save!")
     old_site_title, old_password = parse_config()
-    head, level, page = parse_content()
-    directory = render_menu(head, level, page)
+    head, level = content_outline()
+    directory = render_menu(head, level, None)
     if site_title is None or password is None or password2 != old_password or password == '':
         return set_css() + "<div class='container'><nav>" + \
                 directory + "</nav><section><h1>Error!</h1><a href='/'>Home</a></body></html>"
@@ -2410,6 +3069,7 @@ def saveConfig():
         file = open(config_dir + "config", "w", encoding="utf-8")
         file.write(hashed_password)
         file.close()
+        clear_config_cache()
         return set_css() + "<div class='container'><nav>" + \
                  directory + "</nav><section><h1>config file saved</h1><a href='/'>Home</a></body></html>"
 
@@ -2430,12 +3090,11 @@ def savePage():
     if page_content is None:
         return error_log("no content to save!")
     # 在插入新頁面資料前, 先複製 content.htm 一分到 content_backup.htm
-    shutil.copy2(config_dir + "content.htm", config_dir + "content_backup.htm")
+    backup_content()
     # in Windows client operator, to avoid textarea add extra \n
     # for ajax save comment the next line
     #page_content = page_content.replace("\n","")
-    with open(config_dir + "content.htm", "w", encoding="utf-8") as f:
-        f.write(page_content)
+    write_content(normalize_content(page_content))
     return redirect("/edit_page")
 
 
@@ -2444,8 +3103,7 @@ def search_content(head, page, search):
     """Search content
     """
 
-    find = lambda searchList, elem: [[i for i, x in enumerate(searchList) if x == e] for e in elem]
-    search_result = find(head, [search])[0]
+    search_result = heading_orders(head).get(search, [])
     page_order = []
     page_content = []
     for i in range(len(search_result)):
@@ -2467,8 +3125,8 @@ def search_form(edit):
     """
 
     if isAdmin():
-        head, level, page = parse_content()
-        directory = render_menu(head, level, page)
+        head, level = content_outline()
+        directory = render_menu(head, level, None)
         return set_css() + "<div class='container'><nav>" + \
                  directory + "</nav><section><h1>Search</h1> \
                  <form method='post' action='doSearch'> \
@@ -2479,6 +3137,17 @@ def search_form(edit):
         return redirect("/login")
 
 
+def search_index(head, page):
+
+    """Return the doSearch index updated to the pages of parse_content()
+
+    內容變更後只有新增或修改的頁面需要加入索引
+    """
+
+    _search_index.update(head, page, lambda i: page_texts(page, [i])[0])
+    return _search_index
+
+
 # setup static directory
 @app.route('/static/<path:path>')
 def send_file(path):
@@ -2514,172 +3183,25 @@ def set_admin_css():
     """Set css for admin
     """
 
-    server_ip = init.Init.ip
-    # need to check for IPv4 or IPv6
-    # 根據 IP 地址自動選擇 address family
-    try:
-        # 嘗試解析 IP 地址以確定是 IPv4 還是 IPv6
-        socket.inet_pton(socket.AF_INET, server_ip)
-        address_family = socket.AF_INET
-    except socket.error:
-        try:
-            socket.inet_pton(socket.AF_INET6, server_ip)
-            address_family = socket.AF_INET6
-        except socket.error:
-            # 如果都不是有效的 IP，假設是 hostname 或 localhost
-            address_family = socket.AF_INET6 if ':' in server_address else socket.AF_INET
-    if address_family == socket.AF_INET:
-        server_address = str(server_ip) + ":" + str(static_port)
-    else:
-        server_address = "[" + str(server_ip) + "]:" + str(static_port)
-
-    outstring = '''<!doctype html>
-<html><head>
-<meta http-equiv="content-type" content="text/html;charset=utf-8">
-<title>''' + init.Init.site_title + '''</title> \
-<link rel="stylesheet" type="text/css" href="/static/cmsimply.css">
-''' + syntaxhighlight()
-
-    outstring += '''
-<script src="/static/jquery.js"></script>
-<script type="text/javascript">
-$(function(){
-    $("ul.topmenu> li:has(ul) > a").append('<div class="arrow-right"></div>');
-    $("ul.topmenu > li ul li:has(ul) > a").append('<div class="arrow-right"></div>');
-});
-</script>
-'''
-    # SSL for uwsgi operation
-    if uwsgi:
-        outstring += '''
-<script type="text/javascript">
-if ((location.href.search(/http:/) != -1) && (location.href.search(/login/) != -1)) \
-window.location= 'https://' + location.host + location.pathname + location.search;
-</script>
-'''
     site_title, password = parse_config()
-    outstring += '''
-</head><header><h1>''' + site_title + '''</h1> \
-<confmenu>
-<ul>
-<li><a href="/">Home</a></li>
-<li><a href="/sitemap">SMap</a></li>
-<li><a href="/edit_page">EditA</a></li>
-<li><a href="''' + str(correct_url()) + '''/1">Edit</a></li>
-<li><a href="/edit_config">Config</a></li>
-<li><a href="/search_form">Search</a></li>
-<li><a href="/imageuploadform">IUpload</a></li>
-<li><a href="/image_list">IList</a></li>
-<li><a href="/fileuploadform">FUpload</a></li>
-<li><a href="/download_list">FList</a></li>
-<li><a href="/logout">Logout</a></li>
-<li><a href="/generate_pages">Convert</a></li>
-'''
-    # under uwsgi mode no start_static and static_port anchor links
-    if uwsgi != True:
-        outstring += '''
-<li><a href="/acpform">acp</a></li>
-<li><a href="/start_static/">SStatic</a></li>
-<li><a href="https://'''+ server_address + '''">''' + str(static_port) + '''</a></li>
-'''
-    outstring += '''
-</ul>
-</confmenu></header>
-'''
-    return outstring
+    return chrome_template("set_admin_css").render(
+        title=init.Init.site_title, syntaxhighlight=syntaxhighlight(), uwsgi=uwsgi, site_title=site_title,
+        url=str(correct_url()), server_address=static_server_address(), static_port=static_port)
 
 
 def set_css():
 
     """Set css for dynamic site
     """
-    
-    server_ip = init.Init.ip
-    # need to check for IPv4 or IPv6
-    # 根據 IP 地址自動選擇 address family
-    try:
-        # 嘗試解析 IP 地址以確定是 IPv4 還是 IPv6
-        socket.inet_pton(socket.AF_INET, server_ip)
-        address_family = socket.AF_INET
-    except socket.error:
-        try:
-            socket.inet_pton(socket.AF_INET6, server_ip)
-            address_family = socket.AF_INET6
-        except socket.error:
-            # 如果都不是有效的 IP，假設是 hostname 或 localhost
-            address_family = socket.AF_INET6 if ':' in server_address else socket.AF_INET
-    if address_family == socket.AF_INET:
-        server_address = str(server_ip) + ":" + str(static_port)
-    else:
-        server_address = "[" + str(server_ip) + "]:" + str(static_port)
-
-    outstring = '''<!doctype html>
-<html><head>
-<meta http-equiv="content-type" content="text/html;charset=utf-8">
-<title>''' + init.Init.site_title + '''</title> \
-<link rel="stylesheet" type="text/css" href="/static/cmsimply.css">
-<link rel="shortcut icon" href="/static/favicons.png">
-''' + syntaxhighlight()
-
-    outstring += '''
-<script src="/static/jquery.js"></script>
-<!-- for wink3 客製化關閉-->
-<!--
-<link rel="stylesheet" type="text/css" href="/static/winkPlayer.css" />
-<script type="text/javascript" src="/static/winkPlayer.js"></script>
--->
-<script type="text/javascript">
-$(function(){
-    $("ul.topmenu> li:has(ul) > a").append('<div class="arrow-right"></div>');
-    $("ul.topmenu > li ul li:has(ul) > a").append('<div class="arrow-right"></div>');
-});
-</script>
-'''
-    if uwsgi:
-        outstring += '''
-<script type="text/javascript">
-if ((location.href.search(/http:/) != -1) && (location.href.search(/login/) != -1)) \
-window.location= 'https://' + location.host + location.pathname + location.search;
-</script>
-'''
+
     site_title, password = parse_config()
-    outstring += '''
-</head><header><h1>''' + site_title + '''</h1> \
-<confmenu>
-<ul>
-<li><a href="/">Home</a></li>
-<li><a href="/sitemap">SMap</a></li>
-'''
-    if isAdmin():
-        outstring += '''
-<li><a href="/edit_page">EditA</a></li>
-<li><a href="''' + str(correct_url()) + '''/1">Edit</a></li>
-<li><a href="/edit_config">Config</a></li>
-<li><a href="/search_form">Search</a></li>
-<li><a href="/imageuploadform">IUpload</a></li>
-<li><a href="/image_list">IList</a></li>
-<li><a href="/fileuploadform">FUpload</a></li>
-<li><a href="/download_list">FList</a></li>
-<li><a href="/logout">Logout</a></li>
-<li><a href="/generate_pages">Convert</a></li>
-'''
-        # under uwsgi mode no start_static and static_port  anchor links
-        # only added when user login as admin
-        if uwsgi != True:
-            outstring += '''
-<li><a href="/acpform">acp</a></li>
-<li><a href="/start_static/">SStatic</a></li>
-<li><a href="https://''' + server_address +'''">''' + str(static_port) + '''</a></li>
-'''
-    else:
-        outstring += '''
-<li><a href="/login">Login</a></li>
-'''
-    outstring += '''
-</ul>
-</confmenu></header>
-'''
-    return outstring
+    admin = isAdmin()
+    # under uwsgi mode no start_static and static_port anchor links
+    # only added when user login as admin
+    return chrome_template("set_css").render(
+        title=init.Init.site_title, syntaxhighlight=syntaxhighlight(), uwsgi=uwsgi, site_title=site_title,
+        admin=admin, url=str(correct_url()) if admin else "",
+        server_address=static_server_address(), static_port=static_port)
 
 
 def set_css2():
@@ -2687,79 +3209,9 @@ def set_css2():
     """Set css for static site
     """
 
-    static_head = '''
-        <head>
-        <title>''' + init.Init.site_title + '''</title>
-        <meta charset="utf-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1, shrink-to-fit=no">
-        <link rel="stylesheet" href="./../cmsimde/static/chimper/fonts/icomoon/style.css">
-        <link rel="stylesheet" href="./../cmsimde/static/chimper/css/bootstrap.min.css">
-        <link rel="stylesheet" href="./../cmsimde/static/chimper/css/magnific-popup.css">
-        <link rel="stylesheet" href="./../cmsimde/static/chimper/css/jquery-ui.css">
-        <link rel="stylesheet" href="./../cmsimde/static/chimper/css/owl.carousel.min.css">
-        <link rel="stylesheet" href="./../cmsimde/static/chimper/css/owl.theme.default.min.css">
-        <link rel="stylesheet" href="./../cmsimde/static/chimper/css/bootstrap-datepicker.css">
-        <link rel="stylesheet" href="./../cmsimde/static/chimper/fonts/flaticon/font/flaticon.css">
-        <link rel="stylesheet" href="./../cmsimde/static/chimper/css/aos.css">
-        <link rel="stylesheet" href="./../cmsimde/static/chimper/css/style.css">
-        <link rel="shortcut icon" href="./../cmsimde/static/favicons.png">
-        
-        <style type='text/css'>
-            .site-section {
-            background-color: #FFFF;
-            padding: 40px 40px;
-            }
-            body > div > div.dropdown.open {
-                display: block;
-            }
-        </style>
-    '''
-    outstring = '''<!DOCTYPE html><html>''' + static_head + '''
-        <!-- <script src="./../cmsimde/static/jquery.js"></script> -->
-        <!-- <script src="https://ajax.googleapis.com/ajax/libs/jquery/3.3.1/jquery.min.js"></script> -->
-        <script src="../cmsimde/static/chimper/js/jquery-3.3.1.min.js"></script>
-        <link rel="stylesheet" href="./../cmsimde/static/tipuesearch/css/normalize.min.css">
-        <script src="./../cmsimde/static/tipuesearch/tipuesearch_set.js"></script>
-        <script src="tipuesearch_content.js"></script>
-        <link rel="stylesheet" href="./../cmsimde/static/tipuesearch/css/tipuesearch.css">
-        <script src="./../cmsimde/static/tipuesearch/tipuesearch.js"></script>
-        <!-- for Wink3 客製化關閉 -->
-        <!--
-        <link rel="stylesheet" type="text/css" href="./../cmsimde/static/winkPlayer.css" />
-        <script type="text/javascript" src="./../cmsimde/static/winkPlayer.js"></script>
-        -->
-        <script>
-            /* original tipuesearch
-            $(document).ready(function() {
-                 $('#tipue_search_input').tipuesearch();
-            });
-            */
-            // customed doSearch
-            function doSearch() {
-                $('#tipue_search_input').tipuesearch({
-                    newWindow: true, 
-                    minimumLength: 2,
-                    wholeWords: false, // for search 中文
-                });
-            }
-            $(document).ready(doSearch);
-        </script>
-        ''' + syntaxhighlight2()
-
-    site_title, password = parse_config()
-    if uwsgi:
-        outstring += '''
-<script type="text/javascript">
-if ((location.href.search(/http:/) != -1) && (location.href.search(/login/) != -1)) \
-window.location= 'https://' + location.host + location.pathname + location.search;
-</script></head><body>
-'''
-    else:
-        outstring += '''
-</head>
-<body>
-'''
-    return outstring
+    # 靜態網頁由 generate_static_site 的 process 產生, 不使用 request context
+    return chrome_template("set_css2").render(
+        title=init.Init.site_title, syntaxhighlight=syntaxhighlight2(), uwsgi=uwsgi)
 
 
 def set_footer():
@@ -2785,22 +3237,25 @@ def sitemap(edit):
     """Sitemap for dynamic site
     """
 
-    head, level, page = parse_content()
-    directory = render_menu(head, level, page)
-    sitemap = render_menu(head, level, page, sitemap=1)
+    head, level = content_outline()
+    directory = render_menu(head, level, None)
+    sitemap = render_menu(head, level, None, sitemap=1)
     return set_css() + "<div class='container'><nav>" + directory + \
              "</nav><section><h1>SMap</h1>" + sitemap + \
              "</section></div></body></html>"
 
 
-def sitemap2(head):
+def sitemap2(head, context = None):
 
     """Sitemap for static content generation
     """
 
     edit = 0
-    not_used_head, level, page = parse_content()
-    directory = render_menu2(head, level, page)
+    if context is None:
+        context = static_context(head)
+    level = context["level"]
+    page = context["page"]
+    directory = context["directory"]
     # 先改為使用 render_menu3 而非 render_menu2
     sitemap = render_menu3(head, level, page, sitemap=1)
     # add tipue search id
@@ -2821,6 +3276,57 @@ def sizeof_fmt(num):
     return "%3.1f%s" % (num, 'TB')
 
 
+def split_content(subject, htag):
+
+    """Split subject into pages at the given h1, h2 and h3 tags
+
+    傳回各頁面的 (head, level, start, end), start 與 end 為頁面內容在 subject 中的位置
+    """
+
+    # use name attribute of h* tag to get h1, h2 or h3
+    # the number of h1, h2 or h3 is the level of page menu
+    return _split_at(subject, [(tag.text.strip(), tag.name[1], str(tag)) for tag in htag])
+
+
+def _split_at(subject, headings):
+
+    """Split subject at the (head, level, tag string) headings
+    """
+
+    # 每個標題只從上一個標題結束處往後搜尋一次, 不再反覆 split 與 join 剩餘的 subject
+    n = len(headings)
+    pages = []
+    if n == 0:
+        return pages
+    # 第一個標題之前的內容不列入任何頁面
+    offset = subject.index(headings[0][2]) + len(headings[0][2])
+    for i in range(1, n):
+        position = subject.index(headings[i][2], offset)
+        pages.append((headings[i-1][0], headings[i-1][1], offset, position))
+        offset = position + len(headings[i][2])
+    # the last page content ends before the next occurrence of the last h tag or at the end of subject
+    position = subject.find(headings[n-1][2], offset)
+    if position == -1:
+        position = len(subject)
+    pages.append((headings[n-1][0], headings[n-1][1], offset, position))
+    return pages
+
+
+def split_headings(subject):
+
+    """Split subject returned by normalize_content() into pages
+
+    init.Init.parse_engine 為 "tokenizer" (預設) 時以 heading_tokens() 取得標題,
+    無法確定與 html.parser 結果相同或設為 "html.parser" 時, 以 bs4 解析
+    """
+
+    if getattr(init.Init, "parse_engine", "tokenizer") == "tokenizer":
+        headings = heading_tokens(subject)
+        if headings is not None:
+            return _split_at(subject, headings)
+    return split_content(subject, bs4.BeautifulSoup(subject, "html.parser").find_all(['h1', 'h2', 'h3']))
+
+
 @app.route('/ssavePage', methods=['POST'])
 def ssavePage():
 
@@ -2848,31 +3354,39 @@ def ssavePage():
     # 請注意, 若啟用 fullpage plugin 這裡的 page_content tinymce4 會自動加上 html 頭尾標註
     # for ajax save comment the next line
     #page_content = page_content.replace("\n","")
-    head, level, page = parse_content()
+    storage = content_storage()
+    if storage is not None:
+        # 使用 SQLite 存放頁面時只取標題, 編輯的頁面另外讀取
+        head, level = content_outline()
+    else:
+        head, level, page = parse_content()
     original_head_title = head[int(page_order)]
     # 在插入新頁面資料前, 先複製 content.htm 一分到 content_backup.htm
-    shutil.copy2(config_dir + "content.htm", config_dir + "content_backup.htm")
+    # 使用 SQLite 存放頁面時, 單頁存檔只更新該頁面的資料, 不備份整個網站
+    if storage is None:
+        backup_content()
     if page_content != "":
-        with open(config_dir + "content.htm", "w", encoding="utf-8") as file:
+        if action == "save":
+            new_content = page_content
+        elif storage is not None:
+            new_content = merge_page(storage.page(int(page_order)), page_content)
+        else:
+            new_content = merge_page(page[int(page_order)], page_content)
+        new_page = normalize_page(new_content, int(page_order)) if storage is not None else None
+        if new_page is not None:
+            storage.replace_page(int(page_order), content_pages(new_page))
+            clear_content_cache()
+        else:
+            if storage is not None:
+                head, level, page = parse_content()
+            content = []
             for index in range(len(head)):
                 if index == int(page_order):
-                    if action == "save":
-                        file.write(page_content)
-                    else:
-                        # make orig and new html content into list
-                        newSoup = bs4.BeautifulSoup(page_content, "html.parser")
-                        newList =[str(tag) for tag in newSoup.find_all(['h1', 'h2', 'h3', 'h4', 'p', 'pre', 'ol', 'ul', 'script', 'table'])]
-                        oldPage = page[index]
-                        oldSoup = bs4.BeautifulSoup(oldPage, "html.parser")
-                        oldList =[snTosr(tag) for tag in oldSoup.find_all(['h1', 'h2', 'h3', 'h4', 'p', 'pre', 'ol', 'ul', 'script', 'table'])]
-                        mergedList = merge_sequences(oldList, newList)
-                        newContent = ""
-                        for i in range(len(mergedList)):
-                            newContent += mergedList[i]
-                        file.write(newContent)
+                    content.append(new_content)
                 else:
-                    file.write("<h"+str(level[index])+ ">" + str(head[index]) + "</h" + \
-                                  str(level[index])+">"+str(page[index]))
+                    content.append("<h"+str(level[index])+ ">" + str(head[index]) + "</h" + \
+                                      str(level[index])+">"+str(page[index]))
+            write_content(normalize_content("".join(content)))
     else:
         return error_log("Error: no content to save!")
     # if every ssavePage generate_pages needed
@@ -2880,7 +3394,7 @@ def ssavePage():
 
     # if head[int(page_order)] still existed and equal original_head_title, go back to origin edit status, otherwise go to "/"
     # here the content is modified, we need to parse the new page_content again
-    head, level, page = parse_content()
+    head, level = content_outline()
     # for debug
     # print(original_head_title, head[int(page_order)])
     # 嘗試避免因最後一個標題刪除儲存後產生 internal error 問題
@@ -2968,6 +3482,148 @@ def start_static():
             return "Server error", 500
     else:
         return redirect("/login")
+
+
+def static_page_hash(context, i):
+
+    """Return the hash of everything the i-th static page is generated from
+    """
+
+    head = context["head"]
+    previous_head = head[i-1] if i > 0 else ""
+    next_head = head[i+1] if i < len(head) - 1 else ""
+    key = "\0".join([head[i], previous_head, next_head, context["level"][i], context["page"][i]])
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def static_pages(page):
+
+    """Return page with the static rewrite rules applied to each page
+
+    改寫結果與 parse_content() 的快取一同保存, 內容未變更時不再重新改寫
+    """
+
+    rules = tuple(tuple(rule) for rule in getattr(init.Init, "static_rewrite_rules", None) or static_rewrite_rules)
+    entry = _content_cache.get("entry")
+    if entry is None or entry["page"] is not page:
+        entry = None
+    elif entry.get("static", (None,))[0] == rules:
+        return entry["static"][1]
+    rewrite = static_rewriter(rules)
+    static_page = [rewrite(w) for w in page]
+    if entry is not None:
+        entry["static"] = (rules, static_page)
+    return static_page
+
+
+@functools.lru_cache(maxsize=None)
+def static_rewriter(rules):
+
+    """Return a function replacing every (old, new) pair of rules in a single regex pass
+
+    較長的 old 優先比對, 已改寫的文字不會再被其他規則改寫
+    """
+
+    table = dict(rules)
+    if not table:
+        return str
+    pattern = re.compile("|".join(re.escape(old) for old in sorted(table, key=len, reverse=True)))
+    return functools.partial(pattern.sub, lambda match: table[match.group(0)])
+
+
+@functools.lru_cache(maxsize=None)
+def static_server_address():
+
+    """Return host:port of the static site server, IPv6 addresses enclosed in brackets
+    """
+
+    server_ip = init.Init.ip
+    # need to check for IPv4 or IPv6
+    # 根據 IP 地址自動選擇 address family
+    try:
+        # 嘗試解析 IP 地址以確定是 IPv4 還是 IPv6
+        socket.inet_pton(socket.AF_INET, server_ip)
+        address_family = socket.AF_INET
+    except socket.error:
+        try:
+            socket.inet_pton(socket.AF_INET6, server_ip)
+            address_family = socket.AF_INET6
+        except socket.error:
+            # 如果都不是有效的 IP，假設是 hostname 或 localhost
+            address_family = socket.AF_INET6 if ':' in server_ip else socket.AF_INET
+    if address_family == socket.AF_INET:
+        return str(server_ip) + ":" + str(static_port)
+    else:
+        return "[" + str(server_ip) + "]:" + str(static_port)
+
+
+def static_site_hash(context):
+
+    """Return the hash of the menu and page template shared by all static pages
+    """
+
+    digest = hashlib.sha1()
+    digest.update(context["directory"].encode("utf-8"))
+    digest.update((set_css2() + checkMath()).encode("utf-8"))
+    # 頁面樣板與 tipue search 文字的取法寫在程式中, 程式更新後也必須重新產生所有頁面
+    for filename in (__file__, os.path.join(os.path.dirname(__file__), "search.py")):
+        with open(filename, "rb") as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+def static_context(head):
+
+    """Return level, page content and menu shared by all static pages
+    """
+
+    not_used_head, level, source = parse_content()
+    page = static_pages(source)
+    # source 為改寫路徑前的頁面, 供 page_texts() 取出文字
+    return {"head": head, "level": level, "page": page, "source": source,
+            "directory": render_menu2(head, level, page)}
+
+
+def stream_html(*parts):
+
+    """Stream html parts to the client, each part is a string or a list of strings
+    """
+
+    # 不將整個頁面串接成單一字串, 各部分依序送出
+    def generate():
+        for part in parts:
+            if isinstance(part, str):
+                yield part
+            else:
+                yield from part
+    return Response(stream_with_context(generate()), mimetype="text/html")
+
+
+def sync_content(storage):
+
+    """Import content.htm into storage when it was changed outside of the database
+
+    git pull 或手動修改的 content.htm 在資料庫自上次匯入或匯出後沒有修改時重新匯入,
+    兩者都修改過時傳回 False, content.htm 不可被覆寫
+    """
+
+    signature = _file_signature(config_dir + "content.htm")
+    if signature is None:
+        return True
+    synced = storage.synced()
+    if synced is not None and synced[0] == signature:
+        return True
+    pages = content_pages(normalize_content(file_get_contents(config_dir + "content.htm")))
+    if not storage.empty() and (synced is None or synced[1] != storage.version()):
+        # 資料庫也修改過, 只有頁面與 content.htm 相同 (例如舊版資料庫只少了標題標註) 時才可匯入
+        if storage.load() != tuple([page[i] for page in pages] for i in range(3)):
+            return False
+    storage.replace_all(pages)
+    clear_content_cache()
+    storage.mark_synced(signature, storage.version())
+    return True
+
+
 def syntaxhighlight():
 
     """Return syntaxhighlight needed scripts
@@ -3058,13 +3714,14 @@ img.add_border {
 '''
 
 
-def tinymce_editor(menu_input=None, editor_content=None, page_order=None):
+def tinymce_editor(menu_input=None, editor_content=None, page_order=None, editor=None):
 
     """Tinymce editor scripts
     """
 
-    sitecontent =file_get_contents(config_dir + "content.htm")
-    editor = set_admin_css() + editorhead() + '''</head>''' + editorfoot()
+    # 同一 request 產生多個編輯器時, 由 page_editors() 傳入共用的 editor
+    if editor is None:
+        editor = set_admin_css() + editor_shell()
     # edit all pages
     if page_order is None:
         outstring = editor + "<div class='container'><nav>" + \
@@ -3138,7 +3795,7 @@ def tinymce_editor(menu_input=None, editor_content=None, page_order=None):
         outstring += "</form></section></body></html>"
     else:
         # add viewpage button while single page editing
-        head, level, page = parse_content()
+        head, level = content_outline()
         outstring = "<p id='notice'></p>"
         outstring  += editor + "<div class='container'><nav>" + \
                         menu_input+"</nav><section><form onsubmit='return save_data(this)'> \
@@ -3232,20 +3889,30 @@ def unique(items):
     """Make items element unique
     """
 
-    found = set([])
     keep = []
-    count = {}
-    for item in items:
-        if item not in found:
-            count[item] = 0
-            found.add(item)
-            keep.append(item)
-        else:
-            count[item] += 1
-            keep.append(str(item) + "_" + str(count[item]))
+    for item, (count, totalcount) in zip(items, duplicate_counts(items)):
+        # 第一次出現者保留原值, 之後依序加上 _1, _2...
+        keep.append(item if count == 1 else str(item) + "_" + str(count - 1))
     return keep
 
 
+def merge_page(old_page, new_page):
+
+    """Merge the block tags of new_page into old_page for collaborative save
+    """
+
+    # make orig and new html content into list
+    newSoup = bs4.BeautifulSoup(new_page, "html.parser")
+    newList =[str(tag) for tag in newSoup.find_all(['h1', 'h2', 'h3', 'h4', 'p', 'pre', 'ol', 'ul', 'script', 'table'])]
+    oldSoup = bs4.BeautifulSoup(old_page, "html.parser")
+    oldList =[snTosr(tag) for tag in oldSoup.find_all(['h1', 'h2', 'h3', 'h4', 'p', 'pre', 'ol', 'ul', 'script', 'table'])]
+    mergedList = merge_sequences(oldList, newList)
+    newContent = ""
+    for i in range(len(mergedList)):
+        newContent += mergedList[i]
+    return newContent
+
+
 def merge_sequences(list1, list2):
 
     """Merge sequences
@@ -3301,5 +3968,99 @@ def snTosr(tag):
         return tagStr.replace("\n", "\r")
     else:
         return tagStr
+
+
+def _atomic_write(filename, content):
+
+    """Atomically replace filename with content, return the (mtime, size) signature of the new file
+    """
+
+    # 先寫入同目錄的暫存檔再以 os.replace() 取代, 讀取中的執行緒不會讀到寫到一半的檔案
+    directory, name = os.path.split(filename)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=name + ".", suffix=".tmp")
+    try:
+        # newline="" 不轉換跳行, 寫入的 byte 位置才能與 page index 對應
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as file:
+            file.write(content)
+            file.flush()
+            os.fsync(file.fileno())
+            # os.replace() 保留暫存檔的 mtime 與 size, 在取代前取得 signature, 不會取得其他執行緒之後寫入的檔案
+            stat = os.fstat(file.fileno())
+        # mkstemp 建立的檔案權限為 0600, 沿用原檔案的權限
+        if os.path.isfile(filename):
+            shutil.copymode(filename, temp_path)
+        os.replace(temp_path, filename)
+    except:
+        os.remove(temp_path)
+        raise
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _file_signature(filename):
+
+    """Return [mtime_ns, size] of filename or None when it does not exist
+    """
+
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _write_if_changed(filename, content):
+
+    """Write content to filename unless the file already holds the same content
+    """
+
+    try:
+        with open(filename, "r", encoding="utf-8") as file:
+            if file.read() == content:
+                return False
+    except (OSError, UnicodeDecodeError):
+        pass
+    with open(filename, "w", encoding="utf-8") as file:
+        file.write(content)
+    return True
+
+
+def write_content(content):
+
+    """Atomically replace content.htm with content returned by normalize_content() and rebuild the page index
+
+    使用 SQLite 存放頁面時, 改為取代資料庫中的所有頁面
+    """
+
+    storage = content_storage()
+    if storage is not None:
+        storage.replace_all(content_pages(content))
+        clear_content_cache()
+        return
+    signature = _atomic_write(config_dir + "content.htm", content)
+    clear_content_cache()
+    index = build_page_index(content, normalized=True)
+    if index is None:
+        return
+    index["signature"] = list(signature)
+    _atomic_write(config_dir + "content.idx", json.dumps(index, ensure_ascii=False))
+    index["menu"] = {}
+    _content_cache["index"] = index
+
+
+def write_tipue_search(tipue_pages):
+
+    """Write the tipue search data of the static site under content directory
+
+    tipuesearch_content.js 供 Tipue Search 使用, tipuesearch_content.json 為相同內容的 JSON
+    """
+
+    pages = [dict(page, text=normalize_text(page["text"])) for page in tipue_pages]
+    data = json.dumps({"pages": pages}, ensure_ascii=False, separators=(",", ":"))
+    _write_if_changed(_curdir + "/content/tipuesearch_content.json", data)
+    # JSON 中的 U+2028 與 U+2029 在舊版 javascript 字串中不合法
+    _write_if_changed(_curdir + "/content/tipuesearch_content.js",
+                      "var tipuesearch = " + data.replace("\u2028", "\\u2028").replace("\u2029", "\\u2029") + ";")
+
+
 if __name__ == "__main__":
     app.run()
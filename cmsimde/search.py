@@ -0,0 +1,247 @@
+"""Inverted index of the visible page text for doSearch
+
+英文與數字以單字為 term, 中日韓文字以相鄰兩字 (bigram) 為 term, 頁面依 sha1 增量更新
+"""
+
+import bisect
+import html
+import html.parser
+import math
+import re
+import threading
+
+from storage import page_hash
+
+# 中日韓文字 (假名, 漢字, 諺文) 連續字串或其餘的單字
+_cjk = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"
+_token = re.compile("([" + _cjk + "]+)|[^\\W" + _cjk + "]+")
+# 標題中的 term 在排序時的權重
+HEAD_WEIGHT = 5
+# 關鍵字完整出現在標題或內文時加上的分數
+PHRASE_BONUS = 10
+SNIPPET_LENGTH = 120
+# 只有排名在前的頁面附上 snippet
+SNIPPET_RESULTS = 50
+# 內容不是可見文字的標註
+_hidden_tags = {"script", "style", "head", "title"}
+
+
+class _TextParser(html.parser.HTMLParser):
+
+    """Collect the visible text of a page without building a tree
+    """
+
+    def __init__(self):
+        html.parser.HTMLParser.__init__(self, convert_charrefs=True)
+        self.text = []
+        self.hidden = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _hidden_tags:
+            self.hidden += 1
+
+    def handle_endtag(self, tag):
+        if tag in _hidden_tags and self.hidden > 0:
+            self.hidden -= 1
+
+    def handle_data(self, data):
+        # 註解, CDATA 與 script, style 的內容都不是可見文字
+        if self.hidden == 0:
+            self.text.append(data)
+
+
+def visible_text(page):
+
+    """Return the normalized visible text of a page html
+
+    以 html.parser 依序處理標註, 不建立樹狀結構, 巢狀層數不受限制
+    """
+
+    parser = _TextParser()
+    parser.feed(page)
+    parser.close()
+    return normalize_text(" ".join(parser.text))
+
+
+def normalize_text(text):
+
+    """Return text with whitespace collapsed and repeated lines removed
+    """
+
+    # 同一頁面中重複出現的文字行只保留第一次出現者
+    lines = dict.fromkeys(" ".join(line.split()) for line in text.splitlines())
+    lines.pop("", None)
+    return " ".join(lines)
+
+
+def tokenize(text):
+
+    """Return the terms of text, single CJK characters are paired into bigrams
+    """
+
+    terms = []
+    for match in _token.finditer(text.lower()):
+        run = match.group(0)
+        if match.group(1) is None or len(run) == 1:
+            terms.append(run)
+        else:
+            terms.extend(run[i:i+2] for i in range(len(run) - 1))
+    return terms
+
+
+class SearchIndex(object):
+
+    """Map terms to the pages containing them
+
+    每個頁面以 (heading, page sha1) 為 key, 內容未變更的頁面在更新時不需重新取出文字
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # key: {"head": heading, "text": visible text, "lower": lowercased heading and text, "terms": {term: weight}}
+        self.docs = {}
+        # term: {key: weight}
+        self.postings = {}
+        # key 第一次出現的 page order, 分數相同時依此排序
+        self.orders = {}
+        self.page = None
+        self.vocabulary = None
+
+    def update(self, head, page, text):
+
+        """Index the pages of head and page, text(i) returns the visible text of the i-th page
+
+        只有新增或修改的頁面需要呼叫 text(), 已刪除的頁面自索引移除
+        """
+
+        with self.lock:
+            # parse_content() 快取未變更時傳回相同的 page list
+            if page is self.page:
+                return
+            orders = {}
+            for i, (heading, html_page) in enumerate(zip(head, page)):
+                orders.setdefault((heading, page_hash(html_page)), i)
+            for key in set(self.docs) - set(orders):
+                self._remove(key)
+            for key, i in orders.items():
+                if key not in self.docs:
+                    self._add(key, head[i], text(i))
+            self.orders = orders
+            self.page = page
+
+    def _add(self, key, heading, text):
+        terms = {}
+        for term in tokenize(heading):
+            terms[term] = terms.get(term, 0) + HEAD_WEIGHT
+        for term in tokenize(text):
+            terms[term] = terms.get(term, 0) + 1
+        # 小寫文字供比對整段關鍵字, 不必每次查詢重新轉換
+        self.docs[key] = {"head": heading, "text": text, "lower": heading.lower() + "\n" + text.lower(),
+                          "terms": terms}
+        for term, weight in terms.items():
+            self.postings.setdefault(term, {})[key] = weight
+        self.vocabulary = None
+
+    def _remove(self, key):
+        for term in self.docs.pop(key)["terms"]:
+            postings = self.postings[term]
+            del postings[key]
+            if not postings:
+                del self.postings[term]
+        self.vocabulary = None
+
+    def _expand(self, term):
+
+        """Return the indexed terms matched by a query term
+
+        英數字以前綴比對, 單一中日韓文字比對所有含有該字的 bigram
+        """
+
+        if self.vocabulary is None:
+            self.vocabulary = sorted(self.postings)
+        if _token.fullmatch(term).group(1) is not None:
+            if len(term) == 1:
+                return [t for t in self.vocabulary if term in t]
+            return [term] if term in self.postings else []
+        start = bisect.bisect_left(self.vocabulary, term)
+        end = bisect.bisect_left(self.vocabulary, term + "\U0010ffff")
+        return self.vocabulary[start:end]
+
+    def search(self, keyword):
+
+        """Return (heading, snippet) of the pages containing every term of keyword, best match first
+
+        排名在 SNIPPET_RESULTS 之後的頁面 snippet 為空字串
+        """
+
+        terms = list(dict.fromkeys(tokenize(keyword)))
+        if not terms:
+            return []
+        with self.lock:
+            expanded = [[self.postings[indexed] for indexed in self._expand(term)] for term in terms]
+            # 由出現頁面最少的 term 開始, 之後的 term 只需檢查已符合的頁面
+            expanded.sort(key=lambda postings_list: sum(len(postings) for postings in postings_list))
+            scores = None
+            for postings_list in expanded:
+                matched = {}
+                for postings in postings_list:
+                    # 出現頁面越少的 term 分數越高
+                    idf = math.log(1 + len(self.docs) / len(postings))
+                    if scores is not None and len(scores) < len(postings):
+                        for key in scores:
+                            if key in postings:
+                                matched[key] = matched.get(key, 0) + postings[key] * idf
+                    else:
+                        for key, weight in postings.items():
+                            matched[key] = matched.get(key, 0) + weight * idf
+                if scores is not None:
+                    matched = {key: score + matched[key] for key, score in scores.items() if key in matched}
+                scores = matched
+                if not scores:
+                    return []
+            phrase = keyword.strip().lower()
+            for key in scores:
+                if phrase in self.docs[key]["lower"]:
+                    scores[key] += PHRASE_BONUS
+            ranked = sorted(scores, key=lambda key: (-scores[key], self.orders[key]))
+            pattern = snippet_pattern(keyword)
+            return [(self.docs[key]["head"], snippet(self.docs[key]["text"], pattern) if i < SNIPPET_RESULTS else "")
+                    for i, key in enumerate(ranked)]
+
+
+def snippet_pattern(keyword):
+
+    """Return the regex matching the parts of keyword to be marked in snippets
+    """
+
+    # 整段關鍵字, 各單字或中日韓文字串, 以及 bigram 都可標示, 較長者優先
+    pieces = set([keyword.strip().lower()])
+    for match in _token.finditer(keyword.lower()):
+        pieces.add(match.group(0))
+    pieces.update(tokenize(keyword))
+    pieces.discard("")
+    return re.compile("|".join(re.escape(p) for p in sorted(pieces, key=len, reverse=True)), re.I)
+
+
+def snippet(text, pattern, length=SNIPPET_LENGTH):
+
+    """Return an html escaped part of text around the first match of pattern, matches wrapped in <mark>
+    """
+
+    first = pattern.search(text)
+    if first is None:
+        start = 0
+    else:
+        start = max(0, first.start() - length // 3)
+    end = min(len(text), start + length)
+    outstring = ["..."] if start > 0 else []
+    position = start
+    for match in pattern.finditer(text, start, end):
+        outstring.append(html.escape(text[position:match.start()]))
+        outstring.append("<mark>" + html.escape(match.group(0)) + "</mark>")
+        position = match.end()
+    outstring.append(html.escape(text[position:end]))
+    if end < len(text):
+        outstring.append("...")
+    return "".join(outstring)
+
@@ -0,0 +1,176 @@
+"""SQLite storage of content pages
+
+config/content.db 中每個頁面存為 pages 資料表的一筆資料, 單頁讀取與存檔不需處理整個網站
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+
+
+def page_hash(html):
+
+    """Return the sha1 hex digest of a page html, same as the content.htm page index
+    """
+
+    return hashlib.sha1(html.encode("utf-8")).hexdigest()
+
+
+class SqliteStorage(object):
+
+    """Keep the pages of content.htm as rows of a SQLite database
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        # sqlite3 connection 不可跨執行緒使用, 每個執行緒各自連線
+        self.local = threading.local()
+        with self.connect() as db:
+            db.execute('''CREATE TABLE IF NOT EXISTS pages (
+                page_order INTEGER PRIMARY KEY,
+                level TEXT NOT NULL,
+                heading TEXT NOT NULL,
+                html TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                mtime REAL NOT NULL,
+                heading_html TEXT)''')
+            # 舊版資料庫沒有 heading_html 欄位, 匯出時以 heading 重建標題
+            if "heading_html" not in [row[1] for row in db.execute("PRAGMA table_info(pages)")]:
+                db.execute("ALTER TABLE pages ADD COLUMN heading_html TEXT")
+            db.execute("CREATE INDEX IF NOT EXISTS pages_heading ON pages (heading)")
+            # version 在每次存檔時加 1, 作為快取的 signature
+            db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            db.execute("INSERT OR IGNORE INTO meta VALUES ('version', 0)")
+
+    def connect(self):
+
+        """Return the connection of the current thread
+        """
+
+        db = getattr(self.local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.filename)
+            db.execute("PRAGMA journal_mode=WAL")
+            self.local.db = db
+        return db
+
+    def version(self):
+
+        """Return the number of saves made to the database
+        """
+
+        return self.connect().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    def empty(self):
+
+        """Return True when the database has no page
+        """
+
+        return self.connect().execute("SELECT 1 FROM pages LIMIT 1").fetchone() is None
+
+    def load(self):
+
+        """Return head, level and page lists of all pages
+        """
+
+        head = []
+        level = []
+        page = []
+        for row in self.connect().execute("SELECT heading, level, html FROM pages ORDER BY page_order"):
+            head.append(row[0])
+            level.append(row[1])
+            page.append(row[2])
+        return head, level, page
+
+    def outline(self):
+
+        """Return head, level and hash lists without reading the page html
+        """
+
+        head = []
+        level = []
+        hash = []
+        for row in self.connect().execute("SELECT heading, level, hash FROM pages ORDER BY page_order"):
+            head.append(row[0])
+            level.append(row[1])
+            hash.append(row[2])
+        return {"head": head, "level": level, "hash": hash}
+
+    def page(self, page_order):
+
+        """Return the html of the page at page_order or None
+        """
+
+        row = self.connect().execute("SELECT html FROM pages WHERE page_order = ?", (page_order,)).fetchone()
+        return None if row is None else row[0]
+
+    def export(self):
+
+        """Return all pages joined as content.htm
+        """
+
+        rows = self.connect().execute("SELECT heading, level, html, heading_html FROM pages ORDER BY page_order")
+        return "".join(("<h" + level + ">" + heading + "</h" + level + ">" if heading_html is None else heading_html) +
+                       html for heading, level, html, heading_html in rows)
+
+    def synced(self):
+
+        """Return (content.htm signature, version) recorded by mark_synced() or None
+        """
+
+        meta = dict(self.connect().execute("SELECT key, value FROM meta"))
+        if "htm_version" not in meta:
+            return None
+        return [meta["htm_mtime_ns"], meta["htm_size"]], meta["htm_version"]
+
+    def mark_synced(self, signature, version):
+
+        """Record that content.htm with signature (mtime, size) holds the pages of version
+        """
+
+        db = self.connect()
+        with db:
+            db.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                           [("htm_mtime_ns", signature[0]), ("htm_size", signature[1]), ("htm_version", version)])
+
+    def replace_all(self, pages):
+
+        """Replace every page with pages, a list of (heading, level, html, heading_html)
+
+        heading_html 為頁面內容之前的原始標題標註, 匯出時照原樣寫回
+        """
+
+        db = self.connect()
+        with db:
+            db.execute("DELETE FROM pages")
+            self._insert(db, 0, pages)
+            self._touch(db)
+
+    def replace_page(self, page_order, pages):
+
+        """Replace the page at page_order with pages, a list of (heading, level, html, heading_html)
+
+        單頁編輯後可能產生多個頁面或刪除頁面, 之後頁面的 page_order 隨之位移
+        """
+
+        db = self.connect()
+        with db:
+            db.execute("DELETE FROM pages WHERE page_order = ?", (page_order,))
+            shift = len(pages) - 1
+            if shift != 0:
+                # 先改為負值再轉回, 避免位移途中 page_order 重複
+                db.execute("UPDATE pages SET page_order = -(page_order + ?) - 1 WHERE page_order > ?",
+                           (shift, page_order))
+                db.execute("UPDATE pages SET page_order = -page_order - 1 WHERE page_order < 0")
+            self._insert(db, page_order, pages)
+            self._touch(db)
+
+    def _insert(self, db, page_order, pages):
+        mtime = time.time()
+        db.executemany("INSERT INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                       [(page_order + i, level, heading, html, page_hash(html), mtime, heading_html)
+                        for i, (heading, level, html, heading_html) in enumerate(pages)])
+
+    def _touch(self, db):
+        db.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
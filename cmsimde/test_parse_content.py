@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+
+import bs4
+
+sys.path.append(os.path.dirname(__file__))
+import flaskapp
+
+REPO_CONTENT = os.path.join(os.path.dirname(__file__), "..", "config", "content.htm")
+
+# fragments combined by fuzz_document(), including the cases heading_tokens() must skip or hand over to bs4
+FRAGMENTS = [
+    "<h1>Home</h1>",
+    "<h2>Example</h2>",
+    "<h3>Example</h3>",
+    "<h2 class='title' id=\"x\">With attributes</h2>",
+    "<h2>Fish &amp; Chips &lt;3</h2>",
+    "<h3><b>Bold</b> heading</h3>",
+    "<h2><a href='/get_page/x'>Link</a></h2>",
+    "<h2></h2>",
+    "<h3>  spaced\n heading  </h3>",
+    "<H2>Upper case</H2>",
+    "<h2>Outer<h3>Nested</h3></h2>",
+    "<h2>With <!-- comment --> inside</h2>",
+    "<h1>中文標題</h1>",
+    "<h4>Not a page</h4>",
+    "<p>paragraph</p>",
+    "<p>unclosed paragraph",
+    "<div><p>nested <span>block</span></p></div>",
+    "</h2>",
+    "<br>",
+    "<pre>print('<h2>not a heading</h2>')</pre>",
+    "<script>var s = '<h2>Example</h2>';</script>",
+    "<style>h2 { color: red; }</style>",
+    "<!-- <h2>Commented</h2> -->",
+    "<![CDATA[<h3>cdata</h3>]]>",
+    "<img src='/images/a.png'>",
+    "&nbsp;text &copy; more",
+]
+
+
+def fuzz_document(rand, size=30):
+
+    """Return a random html document built from FRAGMENTS
+    """
+
+    return "".join(rand.choice(FRAGMENTS) for i in range(size))
+
+
+class TestHeadingTokens(unittest.TestCase):
+    def assertSameSplit(self, subject):
+        # heading_tokens() and split_headings() must split normalized content like bs4 html.parser
+        normalized = flaskapp.normalize_content(subject)
+        htag = bs4.BeautifulSoup(normalized, "html.parser").find_all(['h1', 'h2', 'h3'])
+        expected = flaskapp.split_content(normalized, htag)
+        headings = flaskapp.heading_tokens(normalized)
+        if headings is not None:
+            self.assertEqual(flaskapp._split_at(normalized, headings), expected)
+        self.assertEqual(flaskapp.split_headings(normalized), expected)
+        return headings
+
+    def test_repo_content(self):
+        with open(REPO_CONTENT, encoding="utf-8") as f:
+            subject = f.read()
+        self.assertIsNotNone(self.assertSameSplit(subject))
+
+    def test_fuzz_documents(self):
+        rand = random.Random(0)
+        tokenized = 0
+        for i in range(500):
+            if self.assertSameSplit(fuzz_document(rand)) is not None:
+                tokenized += 1
+        # most documents must not fall back to bs4
+        self.assertGreater(tokenized, 100)
+
+
+class TestParseContent(unittest.TestCase):
+    def setUp(self):
+        super(TestParseContent, self).setUp()
+        self.config_dir = flaskapp.config_dir
+        flaskapp.config_dir = tempfile.mkdtemp() + "/"
+        flaskapp.clear_content_cache()
+
+    def tearDown(self):
+        shutil.rmtree(flaskapp.config_dir)
+        flaskapp.config_dir = self.config_dir
+        flaskapp.clear_content_cache()
+        super(TestParseContent, self).tearDown()
+
+    def assertSameParse(self, subject):
+        # parse_content() cut at the page index must return the same lists as the bs4 path
+        flaskapp.write_content(flaskapp.normalize_content(subject))
+        self.assertIsNotNone(flaskapp.page_index())
+        self.assertEqual(flaskapp.parse_content(), flaskapp._parse_content())
+
+    def test_repo_content(self):
+        with open(REPO_CONTENT, encoding="utf-8") as f:
+            self.assertSameParse(f.read())
+
+    def test_fuzz_documents(self):
+        rand = random.Random(1)
+        for i in range(100):
+            # 第一個標題必須為 h1, page index 才能建立
+            self.assertSameParse("<h1>Start</h1>" + fuzz_document(rand))
+            flaskapp.clear_content_cache()
+
+
+class TestSqliteStorage(unittest.TestCase):
+    def setUp(self):
+        super(TestSqliteStorage, self).setUp()
+        self.config_dir = flaskapp.config_dir
+        self.content_storage = getattr(flaskapp.init.Init, "content_storage", "htm")
+        flaskapp.config_dir = tempfile.mkdtemp() + "/"
+        flaskapp.init.Init.content_storage = "sqlite"
+        flaskapp._storage = None
+        flaskapp.clear_content_cache()
+        with open(REPO_CONTENT, encoding="utf-8") as f:
+            self.content = flaskapp.normalize_content(f.read())
+        self.write_htm(self.content)
+
+    def tearDown(self):
+        shutil.rmtree(flaskapp.config_dir)
+        flaskapp.config_dir = self.config_dir
+        flaskapp.init.Init.content_storage = self.content_storage
+        flaskapp._storage = None
+        flaskapp.clear_content_cache()
+        super(TestSqliteStorage, self).tearDown()
+
+    def write_htm(self, content):
+        with open(flaskapp.config_dir + "content.htm", "w", encoding="utf-8", newline="") as f:
+            f.write(content)
+        # 連續寫入的 mtime 可能相同, 另外設定 mtime 使 signature 不同
+        os.utime(flaskapp.config_dir + "content.htm", ns=(0, random.randrange(1, 10 ** 18)))
+
+    def read_htm(self):
+        with open(flaskapp.config_dir + "content.htm", encoding="utf-8", newline="") as f:
+            return f.read()
+
+    def test_export_keeps_heading_markup(self):
+        storage = flaskapp.content_storage()
+        self.assertEqual(storage.export(), self.content)
+
+    def test_changed_htm_is_imported(self):
+        flaskapp.content_storage()
+        # 例如 git pull 取得的 content.htm, 資料庫沒有修改過
+        self.write_htm(self.content + "<h1>Pulled</h1><p>pulled page</p>")
+        self.assertTrue(flaskapp.export_content())
+        self.assertEqual(flaskapp.parse_content()[0][-1], "Pulled")
+        self.assertEqual(self.read_htm(), self.content + "<h1>Pulled</h1><p>pulled page</p>")
+
+    def test_conflict_keeps_htm(self):
+        storage = flaskapp.content_storage()
+        storage.replace_page(0, flaskapp.content_pages("<h1>Edited</h1><p>in database</p>"))
+        self.write_htm(self.content + "<h1>Pulled</h1><p>pulled page</p>")
+        self.assertFalse(flaskapp.export_content())
+        self.assertEqual(self.read_htm(), self.content + "<h1>Pulled</h1><p>pulled page</p>")
+        self.assertEqual(flaskapp.parse_content()[0][0], "Edited")
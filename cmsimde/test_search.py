@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.dirname(__file__))
+import search
+
+HEAD = ["Home", "中文", "Python", "Home"]
+PAGE = [
+    "<p>about flask</p>",
+    "<p>這是中文內容的頁面</p>",
+    "<p>python <b>tips</b> 中文</p>",
+    "<p>second home page</p>",
+    ]
+
+
+def visible(html):
+
+    """Strip the tags of the PAGE fragments
+    """
+
+    for tag in ("<p>", "</p>", "<b>", "</b>"):
+        html = html.replace(tag, "")
+    return html
+
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        super(TestSearchIndex, self).setUp()
+        self.index = search.SearchIndex()
+        self.extracted = []
+        self.index.update(HEAD, list(PAGE), lambda i: self.text(PAGE[i]))
+
+    def text(self, html):
+        self.extracted.append(html)
+        return visible(html)
+
+    def headings(self, keyword):
+        return [heading for heading, snippet in self.index.search(keyword)]
+
+    def test_tokenize(self):
+        self.assertEqual(search.tokenize("Flask 中文內容 x"), ["flask", "中文", "文內", "內容", "x"])
+
+    def test_search(self):
+        self.assertEqual(self.headings("中文"), ["中文", "Python"])
+        # 單一中文字與英文前綴
+        self.assertEqual(self.headings("容"), ["中文"])
+        self.assertEqual(self.headings("PYTH"), ["Python"])
+        self.assertEqual(self.headings("home"), ["Home", "Home"])
+        # html 標註不是可見文字
+        self.assertEqual(self.headings("b"), [])
+        self.assertEqual(self.headings(""), [])
+
+    def test_snippet(self):
+        self.assertEqual(self.index.search("內容")[0][1], "這是中文<mark>內容</mark>的頁面")
+        self.assertEqual(search.snippet("a <b> c", search.snippet_pattern("c")), "a &lt;b&gt; <mark>c</mark>")
+
+    def test_incremental_update(self):
+        page = list(PAGE)
+        page[1] = "<p>改寫後的頁面</p>"
+        self.extracted = []
+        self.index.update(HEAD, page, lambda i: self.text(page[i]))
+        # 只有修改的頁面需要重新取出文字
+        self.assertEqual(self.extracted, [page[1]])
+        self.assertEqual(self.headings("內容"), [])
+        self.assertEqual(self.headings("改寫"), ["中文"])
+
+
+class TestTipueData(unittest.TestCase):
+    def test_visible_text(self):
+        self.assertEqual(search.visible_text("<p>a &amp; b</p><script>var c;</script><!-- d -->\n<div><p>e</div>"),
+                         "a & b e")
+        # html.parser 不建立樹狀結構, 深層巢狀的文字不會遺漏
+        self.assertEqual(search.visible_text("<div>" * 5000 + "deepest" + "</div>" * 5000), "deepest")
+
+    def test_normalize_text(self):
+        self.assertEqual(search.normalize_text(" a \xa0 b\n\n c\n a  \xa0b \n"), "a b c")
+
+
+if __name__ == "__main__":
+    unittest.main()
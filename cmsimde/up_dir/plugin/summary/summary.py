@@ -11,6 +11,9 @@ from pelican import signals
 from pelican.generators import ArticlesGenerator, StaticGenerator, PagesGenerator
 import re
 
+_div_open = re.compile(r"<div.*>")
+_div_close = re.compile(r"</div>")
+
 def initialized(pelican):
     from pelican.settings import DEFAULT_CONFIG
     DEFAULT_CONFIG.setdefault('SUMMARY_BEGIN_MARKER',
@@ -25,23 +28,12 @@ def initialized(pelican):
                                     '<!-- PELICAN_END_SUMMARY -->')
         pelican.settings.setdefault('SUMMARY_USE_FIRST_PARAGRAPH', False)
 
-def extract_summary(instance):
-    # if summary is already specified, use it
-    # if there is no content, there's nothing to do
-    if hasattr(instance, '_summary') or 'summary' in instance.metadata:
-        instance.has_summary = True
-        return
+def summarize(content, begin_marker, end_marker, use_first_paragraph):
+    """Return (summary, markers to remove from content) for the given content.
 
-    if not instance._content:
-        instance.has_summary = False
-        return
-
-    begin_marker = instance.settings['SUMMARY_BEGIN_MARKER']
-    end_marker   = instance.settings['SUMMARY_END_MARKER']
-    use_first_paragraph = instance.settings['SUMMARY_USE_FIRST_PARAGRAPH']
+    The summary is None when the content has no summary.
+    """
     remove_markers = True
-
-    content = instance._update_content(instance._content, instance.settings['SITEURL'])
     begin_summary = -1
     end_summary = -1
     if begin_marker:
@@ -56,8 +48,7 @@ def extract_summary(instance):
         end_summary = content.find(end_marker)
 
     if begin_summary == -1 and end_summary == -1:
-        instance.has_summary = False
-        return
+        return None, []
 
     # skip over the begin marker, if present
     if begin_summary == -1:
@@ -70,15 +61,46 @@ def extract_summary(instance):
 
     summary = content[begin_summary:end_summary]
 
+    removed = []
     if remove_markers:
-        # remove the markers from the content
+        # the markers to remove from the content
         if begin_summary:
-            content = content.replace(begin_marker, '', 1)
+            removed.append(begin_marker)
         if end_summary:
-            content = content.replace(end_marker, '', 1)
+            removed.append(end_marker)
+
+    summary = _div_open.sub("", summary)
+    summary = _div_close.sub("", summary)
+    return summary, removed
+
+
+def extract_summary(instance):
+    # if summary is already specified, use it
+    # if there is no content, there's nothing to do
+    if hasattr(instance, '_summary') or 'summary' in instance.metadata:
+        instance.has_summary = True
+        return
+
+    if not instance._content:
+        instance.has_summary = False
+        return
+
+    content = instance._update_content(instance._content, instance.settings['SITEURL'])
+    summary, removed = summarize(content,
+                                 instance.settings['SUMMARY_BEGIN_MARKER'],
+                                 instance.settings['SUMMARY_END_MARKER'],
+                                 instance.settings['SUMMARY_USE_FIRST_PARAGRAPH'])
+    set_summary(instance, content, summary, removed)
+
+
+def set_summary(instance, content, summary, removed):
+    if summary is None:
+        instance.has_summary = False
+        return
 
-    summary = re.sub(r"<div.*>", "", summary)
-    summary = re.sub(r"</div>", "", summary)
+    # remove the markers from the content
+    for marker in removed:
+        content = content.replace(marker, '', 1)
 
     instance._content = content
     # default_status was added to Pelican Content objects after 3.7.1.
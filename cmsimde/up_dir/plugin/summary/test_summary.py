@@ -73,3 +73,18 @@ class TestSummary(unittest.TestCase):
         # test both the summary and the marker removal
         self.assertEqual(page.summary, TEST_SUMMARY)
         self.assertEqual(page.content, 'FOOBAR' + TEST_SUMMARY + TEST_CONTENT)
+
+
+class TestSummarize(unittest.TestCase):
+    def setUp(self):
+        super(TestSummarize, self).setUp()
+        self.arguments = [
+            (TEST_SUMMARY + '<!-- PELICAN_END_SUMMARY -->' + TEST_CONTENT,
+             '<!-- PELICAN_BEGIN_SUMMARY -->', '<!-- PELICAN_END_SUMMARY -->', False),
+            (TEST_CONTENT, '<!-- PELICAN_BEGIN_SUMMARY -->', '<!-- PELICAN_END_SUMMARY -->', False),
+        ]
+
+    def test_summarize(self):
+        self.assertEqual(summary.summarize(*self.arguments[0]),
+                         (TEST_SUMMARY, ['<!-- PELICAN_END_SUMMARY -->']))
+        self.assertEqual(summary.summarize(*self.arguments[1]), (None, []))
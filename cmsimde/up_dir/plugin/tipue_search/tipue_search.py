@@ -32,13 +32,12 @@ class Tipue_Search_JSON_Generator(object):
         self.siteurl = settings.get('SITEURL')
         self.tpages = settings.get('TEMPLATE_PAGES')
         self.output_path = output_path
-        self.json_nodes = []
 
 
     def create_json_node(self, page):
 
         if getattr(page, 'status', 'published') != 'published':
-            return
+            return None
 
         soup_title = BeautifulSoup(page.title.replace('&nbsp;', ' '), 'html.parser')
         page_title = soup_title.get_text(' ', strip=True).replace('“', '"').replace('”', '"').replace('’', "'").replace('^', '&#94;')
@@ -59,7 +58,7 @@ class Tipue_Search_JSON_Generator(object):
                 'tags': page_category,
                 'url': page_url}
 
-        self.json_nodes.append(node)
+        return node
 
 
     def create_tpage_node(self, srclink):
@@ -84,36 +83,43 @@ class Tipue_Search_JSON_Generator(object):
                 'tags': page_category,
                 'url': page_url}
 
-        self.json_nodes.append(node)
+        return node
 
 
-    def generate_output(self, writer):
-        path = os.path.join(self.output_path, 'tipuesearch_content.json')
-
-        pages = self.context['pages'] + self.context['articles']
-
-        for article in self.context['articles']:
-            pages += article.translations
+    def json_nodes(self, pages):
 
+        # 依序產生各頁面的 node, 不在記憶體中保留所有 node
         for srclink in self.tpages:
-            self.create_tpage_node(srclink)
+            yield self.create_tpage_node(srclink)
 
         for page in pages:
-            self.create_json_node(page)
-        root_node = {'pages': self.json_nodes}
+            node = self.create_json_node(page)
+            if node is not None:
+                yield node
 
-        with open(path, 'w', encoding='utf-8') as fd:
-            # 寫出所需要的 .json 檔案
-            json.dump(root_node, fd, separators=(',', ':'), ensure_ascii=False)
 
+    def generate_output(self, writer):
+        path = os.path.join(self.output_path, 'tipuesearch_content.json')
         # 以下寫出 .js 檔案, 主要用於近端的 Tipue search
         js_path = os.path.join(self.output_path, 'tipuesearch_content.js')
-        with open(js_path, 'w', encoding='utf-8') as fd:
-            # 寫出所需要的 .js 檔案
-            search_text = json.dumps(root_node, separators=(',', ':'), ensure_ascii=False)
-            fd.write('var tipuesearch = ')
-            fd.write(search_text)
-            fd.write(';')
+
+        pages = self.context['pages'] + self.context['articles']
+
+        for article in self.context['articles']:
+            pages += article.translations
+
+        with open(path, 'w', encoding='utf-8') as fd, open(js_path, 'w', encoding='utf-8') as js_fd:
+            # 寫出所需要的 .json 與 .js 檔案, 每個 node 只序列化一次並同時寫入兩個檔案
+            fd.write('{"pages":[')
+            js_fd.write('var tipuesearch = {"pages":[')
+            separator = ''
+            for node in self.json_nodes(pages):
+                search_text = separator + json.dumps(node, separators=(',', ':'), ensure_ascii=False)
+                fd.write(search_text)
+                js_fd.write(search_text)
+                separator = ','
+            fd.write(']}')
+            js_fd.write(']};')
 
 def get_generators(generators):
     return Tipue_Search_JSON_Generator
@@ -14,6 +14,17 @@ class Init(object):
     ip = "127.0.0.1"
     dynamic_port = 9444
     static_port = 8444
+    # "htm" keeps all pages in config/content.htm, "sqlite" stores one row per page in config/content.db
+    content_storage = "htm"
+    # processes used by generate_pages, 0 uses every CPU
+    # the processes are forked from the server, only use more than 1 with a single-threaded server
+    generate_workers = 1
+    # "tokenizer" splits content.htm pages with a heading tokenizer, "html.parser" always uses bs4
+    parse_engine = "tokenizer"
+    # seconds parse_config() reuses its result before checking config/config and config/sitetitle again
+    config_cache_seconds = 2
+    # (old, new) pairs replacing flaskapp.static_rewrite_rules when converting pages, None keeps the default rules
+    static_rewrite_rules = None
     def __init__(self):
         # hope to create downloads and images directories　
         if not os.path.isdir(_curdir + "/downloads"):
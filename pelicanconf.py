@@ -45,6 +45,8 @@ PLUGINS = ['summary', 'tipue_search', 'sitemap', 'neighbors']
 # for sitemap plugin
 SITEMAP = {
     'format': 'xml',
+    # 保留各 URL 的 hash 與 lastmod, 內容未變更的頁面沿用原先的 lastmod, 預設不使用
+    #'cache_path': 'config/sitemap_cache.json',
     'priorities': {
         'articles': 0.5,
         'indexes': 0.5,
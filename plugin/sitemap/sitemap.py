@@ -10,6 +10,8 @@ from __future__ import unicode_literals
 
 import re
 import collections
+import hashlib
+import json
 import os.path
 
 from datetime import datetime
@@ -45,6 +47,23 @@ XML_FOOTER = """
 </urlset>
 """
 
+XML_INDEX_HEADER = """<?xml version="1.0" encoding="utf-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+"""
+
+XML_SITEMAP = """
+<sitemap>
+<loc>{0}/{1}</loc>
+</sitemap>
+"""
+
+XML_INDEX_FOOTER = """
+</sitemapindex>
+"""
+
+# a sitemap may not list more than 50,000 URLs
+MAX_URLS = 50000
+
 
 def format_date(date):
     if date.tzinfo:
@@ -54,6 +73,31 @@ def format_date(date):
         tz = "-00:00"
     return date.strftime("%Y-%m-%dT%H:%M:%S") + tz
 
+
+def load_cache(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return {}
+
+
+def save_cache(path, cache):
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    temp = path + '.tmp'
+    with open(temp, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, separators=(',', ':'), ensure_ascii=False)
+    os.replace(temp, path)
+
+
+def file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        digest.update(f.read())
+    return digest.hexdigest()
+
 class SitemapGenerator(object):
 
     def __init__(self, context, settings, path, theme, output_path, *null):
@@ -84,6 +128,11 @@ class SitemapGenerator(object):
 
         self.sitemapExclude = []
 
+        # incremental mode: URL -> [dates, [mtime, size], hash, lastmod] of the previous runs
+        self.cache_path = None
+        self.cache = None
+        self.max_urls = MAX_URLS
+
         config = settings.get('SITEMAP', {})
 
         if not isinstance(config, dict):
@@ -93,6 +142,8 @@ class SitemapGenerator(object):
             pris = config.get('priorities')
             chfreqs = config.get('changefreqs')
             self.sitemapExclude = config.get('exclude', [])
+            self.cache_path = config.get('cache_path')
+            self.max_urls = config.get('max_urls', MAX_URLS)
 
             if fmt not in ('xml', 'txt'):
                 warning("sitemap plugin: SITEMAP['format'] must be `txt' or `xml'")
@@ -133,26 +184,28 @@ class SitemapGenerator(object):
                 warning("sitemap plugin: SITEMAP['changefreqs'] must be a dict")
                 warning("sitemap plugin: using the default values")
 
-    def write_url(self, page, fd):
+    def url_entry(self, page):
 
         if getattr(page, 'status', 'published') != 'published':
-            return
+            return None
 
         # We can disable categories/authors/etc by using False instead of ''
         if not page.save_as:
-            return
+            return None
 
         page_path = os.path.join(self.output_path, page.save_as)
         if not os.path.exists(page_path):
-            return
+            return None
 
-        lastdate = getattr(page, 'date', self.now)
-        try:
-            lastdate = self.get_date_modified(page, lastdate)
-        except ValueError:
-            warning("sitemap plugin: " + page.save_as + " has invalid modification date,")
-            warning("sitemap plugin: using date value as lastmod.")
-        lastmod = format_date(lastdate)
+        pageurl = '' if page.url == 'index.html' else page.url
+
+        if self.format != 'xml':
+            return self.siteurl + '/' + pageurl + '\n'
+
+        #Exclude URLs from the sitemap:
+        for regstr in self.sitemapExclude:
+            if re.match(regstr, pageurl):
+                return None
 
         if isinstance(page, contents.Article):
             pri = self.priorities['articles']
@@ -164,19 +217,37 @@ class SitemapGenerator(object):
             pri = self.priorities['indexes']
             chfreq = self.changefreqs['indexes']
 
-        pageurl = '' if page.url == 'index.html' else page.url
-        
-        #Exclude URLs from the sitemap:
-        if self.format == 'xml':
-            flag = False
-            for regstr in self.sitemapExclude:
-                if re.match(regstr, pageurl):
-                    flag = True
-                    break
-            if not flag:
-                fd.write(XML_URL.format(self.siteurl, pageurl, lastmod, chfreq, pri))
+        return XML_URL.format(self.siteurl, pageurl, self.get_lastmod(page, page_path, pageurl), chfreq, pri)
+
+    def get_lastmod(self, page, page_path, pageurl):
+        if self.cache is None:
+            return self.format_lastmod(page)
+
+        # the lastmod is kept as long as the page file and its dates are the same
+        dates = '{0}\0{1}'.format(getattr(page, 'date', None), getattr(page, 'modified', None))
+        stat = os.stat(page_path)
+        signature = [stat.st_mtime_ns, stat.st_size]
+        cached = self.cache['old'].get(pageurl)
+        if cached is not None and cached[0] == dates and cached[1] == signature:
+            # the file was not written again, no need to read it
+            digest = cached[2]
         else:
-            fd.write(self.siteurl + '/' + pageurl + '\n')
+            digest = file_hash(page_path)
+        if cached is not None and cached[0] == dates and cached[2] == digest:
+            lastmod = cached[3]
+        else:
+            lastmod = self.format_lastmod(page)
+        self.cache['new'][pageurl] = [dates, signature, digest, lastmod]
+        return lastmod
+
+    def format_lastmod(self, page):
+        lastdate = getattr(page, 'date', None) or self.now
+        try:
+            lastdate = self.get_date_modified(page, lastdate)
+        except ValueError:
+            warning("sitemap plugin: " + page.save_as + " has invalid modification date,")
+            warning("sitemap plugin: using date value as lastmod.")
+        return format_date(lastdate)
 
     def get_date_modified(self, page, default):
         if hasattr(page, 'modified'):
@@ -216,34 +287,87 @@ class SitemapGenerator(object):
 
         info('writing {0}'.format(path))
 
-        with open(path, 'w', encoding='utf-8') as fd:
+        if self.cache_path and self.format == 'xml':
+            cache = load_cache(self.cache_path)
+            # local and published builds keep their own entries
+            self.cache = {'old': cache.get(self.siteurl, {}), 'new': {}}
+
+        FakePage = collections.namedtuple('FakePage',
+                                          ['status',
+                                           'date',
+                                           'url',
+                                           'save_as'])
+
+        fakes = [FakePage(status='published',
+                          date=None,
+                          url=standard_page_url,
+                          save_as=standard_page_url)
+                 for standard_page_url in ['index.html',
+                                           'archives.html',
+                                           'tags.html',
+                                           'categories.html']]
+
+        # entries are formatted one at a time while the sitemap is written
+        entries = (self.url_entry(page) for page in fakes + pages)
+        entries = (entry for entry in entries if entry is not None)
 
-            if self.format == 'xml':
-                fd.write(XML_HEADER)
-            else:
+        if self.format == 'xml':
+            self.write_xml(path, entries)
+        else:
+            with open(path, 'w', encoding='utf-8') as fd:
                 fd.write(TXT_HEADER.format(self.siteurl))
-
-            FakePage = collections.namedtuple('FakePage',
-                                              ['status',
-                                               'date',
-                                               'url',
-                                               'save_as'])
-
-            for standard_page_url in ['index.html',
-                                      'archives.html',
-                                      'tags.html',
-                                      'categories.html']:
-                fake = FakePage(status='published',
-                                date=self.now,
-                                url=standard_page_url,
-                                save_as=standard_page_url)
-                self.write_url(fake, fd)
-
-            for page in pages:
-                self.write_url(page, fd)
-
-            if self.format == 'xml':
-                fd.write(XML_FOOTER)
+                for entry in entries:
+                    fd.write(entry)
+
+        if self.cache is not None:
+            cache[self.siteurl] = self.cache['new']
+            save_cache(self.cache_path, cache)
+            self.cache = None
+
+    def write_xml(self, path, entries):
+        # sitemap-1.xml, sitemap-2.xml, ... each with at most max_urls URLs
+        parts = []
+        fd = None
+        count = 0
+        try:
+            for entry in entries:
+                if fd is None or count == self.max_urls:
+                    fd = self.open_part(fd, parts)
+                    count = 0
+                fd.write(entry)
+                count += 1
+            if fd is None:
+                fd = self.open_part(fd, parts)
+            fd.write(XML_FOOTER)
+        finally:
+            if fd is not None:
+                fd.close()
+
+        if len(parts) == 1:
+            # a single sitemap is written as before
+            os.replace(os.path.join(self.output_path, parts[0]), path)
+        else:
+            info('writing {0} sitemaps in the index {1}'.format(len(parts), path))
+            with open(path, 'w', encoding='utf-8') as fd:
+                fd.write(XML_INDEX_HEADER)
+                for part in parts:
+                    fd.write(XML_SITEMAP.format(self.siteurl, part))
+                fd.write(XML_INDEX_FOOTER)
+
+        # remove the sitemaps left by a previous, larger site
+        number = max(len(parts), 1) + 1
+        while os.path.exists(os.path.join(self.output_path, 'sitemap-{0}.xml'.format(number))):
+            os.remove(os.path.join(self.output_path, 'sitemap-{0}.xml'.format(number)))
+            number += 1
+
+    def open_part(self, fd, parts):
+        if fd is not None:
+            fd.write(XML_FOOTER)
+            fd.close()
+        parts.append('sitemap-{0}.xml'.format(len(parts) + 1))
+        fd = open(os.path.join(self.output_path, parts[-1]), 'w', encoding='utf-8')
+        fd.write(XML_HEADER)
+        return fd
 
 
 def get_generators(generators):
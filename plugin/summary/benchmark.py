@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of the summary extraction on a synthetic markdown/ directory
+
+python3 plugin/summary/benchmark.py --articles 5000
+"""
+
+from __future__ import unicode_literals
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import markdown
+
+sys.path.append(os.path.dirname(__file__))
+import summary
+
+BEGIN_MARKER = '<!-- PELICAN_BEGIN_SUMMARY -->'
+END_MARKER = '<!-- PELICAN_END_SUMMARY -->'
+
+
+def write_markdown(path, articles, seed=0):
+    """Write articles markdown files like the ones of the markdown/ directory."""
+    rand = random.Random(seed)
+    for i in range(articles):
+        paragraphs = ['Paragraph %d of article %d 中文內容 %s.' % (j, i, ' lorem ipsum' * rand.randint(5, 40))
+                      for j in range(rand.randint(3, 12))]
+        # most articles end their summary with the marker, some have none
+        if i % 5:
+            paragraphs.insert(1, END_MARKER)
+        with open(os.path.join(path, 'article%05d.md' % i), 'w', encoding='utf-8') as f:
+            f.write('---\nTitle: Article %d\nDate: 2020-08-13 11:00\nCategory: Misc\nTags: bench\n'
+                    'Slug: article-%d\nAuthor: yen\n---\n\n' % (i, i))
+            f.write('\n\n'.join(paragraphs))
+            f.write('\n\n```python\nprint(%d)\n```\n' % i)
+
+
+def read_markdown(path):
+    """Return the html of the markdown files in path, as pelican would read them."""
+    md = markdown.Markdown(extensions=['markdown.extensions.extra', 'markdown.extensions.meta'])
+    contents = []
+    for name in sorted(os.listdir(path)):
+        with open(os.path.join(path, name), encoding='utf-8') as f:
+            contents.append(md.reset().convert(f.read()))
+    return contents
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--articles', type=int, default=5000)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'markdown')
+    os.makedirs(path)
+    try:
+        write_markdown(path, args.articles)
+        contents, read_time = timed(read_markdown, path)
+        arguments = [(content, BEGIN_MARKER, END_MARKER, False) for content in contents]
+        print('%d articles, %.1f MB html, markdown %.3f s' % (
+            len(contents), sum(len(c) for c in contents) / 1e6, read_time))
+
+        summaries, summary_time = timed(lambda: [summary.summarize(*args) for args in arguments])
+        print('summary %.3f s, %.1f us per article, %d with a summary' % (
+            summary_time, summary_time / len(arguments) * 1e6, sum(s is not None for s, removed in summaries)))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()